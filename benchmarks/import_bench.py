@@ -0,0 +1,99 @@
+# benchmarks/import_bench.py
+"""
+Время холодного старта точек входа: импорт модуля в новом интерпретаторе
+(по -X importtime) и полный прогон крон-задачи постинга, когда отправлять нечего.
+
+    python -m benchmarks.import_bench --repeat 5
+
+Прогон крон-задачи идёт с пустым DATA_DIR во временном каталоге,
+поэтому рабочая база и Telegram не затрагиваются.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULES = ["utils.post_next", "utils.post_to_telegram", "utils.scheduler", "sources.collector", "main"]
+
+
+def _indent(name: str) -> int:
+    return len(name) - len(name.lstrip())
+
+
+def import_time(module: str):
+    """Собственное время импорта модуля (мс) и самые дорогие зависимости [(мс, имя)]."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            entries.append((int(cumulative) / 1000, name.rstrip()))
+    # -X importtime печатает зависимости перед модулем, на уровень глубже
+    pos = max(i for i, (_, name) in enumerate(entries) if name.strip() == module)
+    total, depth = entries[pos][0], _indent(entries[pos][1])
+    direct = []
+    for ms, name in reversed(entries[:pos]):
+        if _indent(name) <= depth:
+            break
+        if _indent(name) == depth + 2:
+            direct.append((ms, name.strip()))
+    return total, sorted(direct, reverse=True)[:3]
+
+
+def interpreter_time() -> float:
+    """Запуск пустого интерпретатора (мс) — нижняя граница для любой задачи."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def post_job_time() -> float:
+    """Полное время `python -m utils.post_next --once` без запланированных постов (мс)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATA_DIR=tmp, PYTHONPATH=str(ROOT))
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "utils.post_next", "--once"],
+            cwd=tmp, env=env, check=True, capture_output=True,
+        )
+        return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    args = parser.parse_args()
+
+    baseline = statistics.median(interpreter_time() for _ in range(args.repeat))
+    print(f"{'пустой интерпретатор':<28} {baseline:8.1f} мс")
+
+    for module in args.modules:
+        try:
+            runs = [import_time(module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{module:<28} ошибка импорта: {e}")
+            continue
+        total = statistics.median(ms for ms, _ in runs)
+        heavy = ", ".join(f"{name} {ms:.1f}" for ms, name in runs[-1][1])
+        print(f"{module:<28} {total:8.1f} мс  ({heavy})")
+
+    job = statistics.median(post_job_time() for _ in range(args.repeat))
+    print(f"{'post_next --once (пусто)':<28} {job:8.1f} мс  (включая запуск интерпретатора)")
+
+
+if __name__ == "__main__":
+    main()
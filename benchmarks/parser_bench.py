@@ -0,0 +1,131 @@
+# benchmarks/parser_bench.py
+"""
+Сравнение HTML-бэкендов BeautifulSoup на наших страницах:
+скорость разбора и совпадение результата с html.parser
+(текст статьи и выбранная картинка).
+
+    python -m benchmarks.parser_bench --parsers html.parser lxml
+
+Страницы берутся из HTTP-кеша (data/http_cache). Если он пуст — страницы
+собираются из текстов корпуса benchmarks/corpus (архив utils.article_store) по типовому шаблону.
+"""
+import argparse
+import json
+import time
+from html import escape
+from pathlib import Path
+
+from bs4 import BeautifulSoup, FeatureNotFound
+
+from utils.article_extractor import extract_text
+from utils.article_store import read_texts
+from utils.helpers import find_main_image
+from utils.http_cache import HTTP_CACHE_DIR
+
+# замороженный корпус из 150 статей: в git он не растёт, в отличие от data/articles
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+
+PAGE_TEMPLATE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{title}</title>{og}</head>
+<body>
+<header><nav><a href="/">Home</a> <a href="/news">News</a> <a href="/reviews">Reviews</a>
+<img src="/static/logo.svg" class="site-logo"></nav></header>
+<main><article class="post">
+<h1>{title}</h1>
+<img src="/uploads/{id}-hero.jpg" class="featured-image">
+{paragraphs}
+</article>
+<aside><h3>Related</h3><ul>{related}</ul></aside></main>
+<footer><p>Privacy policy and cookie settings for this site.</p>
+<img src="/static/ads/banner.gif" class="advert"></footer>
+</body></html>
+"""
+
+
+def load_cached_pages(limit: int):
+    """HTML-страницы из дискового HTTP-кеша: [(url, html)]."""
+    pages = []
+    for meta_path in sorted(HTTP_CACHE_DIR.glob("*/*.json")):
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except ValueError:
+            continue
+        headers = {k.lower(): v for k, v in meta.get("headers", {}).items()}
+        if "text/html" not in headers.get("content-type", ""):
+            continue
+        body = meta_path.with_suffix(".body").read_bytes()
+        pages.append((meta["final_url"], body.decode("utf-8", errors="replace")))
+        if len(pages) >= limit:
+            break
+    return pages
+
+
+def build_pages_from_corpus(limit: int):
+    """Синтетические страницы из текстов корпуса: [(url, html)]."""
+    pages = []
+    for i, (news_id, text) in enumerate(read_texts(CORPUS_DIR)[:limit]):
+        lines = text.splitlines()
+        title = escape(lines[0][:80]) if lines else news_id
+        og = f'<meta property="og:image" content="/og/{news_id}.jpg">' if i % 2 == 0 else ""
+        paragraphs = "\n".join(f"<p>{escape(line)}</p>" for line in lines)
+        related = "".join(f'<li><a href="/a/{j}">Related story number {j}</a></li>' for j in range(8))
+        html = PAGE_TEMPLATE.format(
+            title=title, og=og, id=news_id, paragraphs=paragraphs, related=related
+        )
+        pages.append((f"https://example.com/{news_id}", html))
+    return pages
+
+
+def run_parser(parser: str, pages, rounds: int):
+    """Разбирает все страницы rounds раз; возвращает (секунды, результаты)."""
+    results = []
+    start = time.perf_counter()
+    for r in range(rounds):
+        for url, html in pages:
+            soup = BeautifulSoup(html, parser)
+            out = (extract_text(soup), find_main_image(soup, url))
+            if r == 0:
+                results.append(out)
+    return time.perf_counter() - start, results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark BeautifulSoup HTML parser backends")
+    ap.add_argument("--parsers", nargs="+", default=["html.parser", "lxml"])
+    ap.add_argument("--limit", type=int, default=200, help="max pages")
+    ap.add_argument("--rounds", type=int, default=3)
+    args = ap.parse_args()
+
+    pages = load_cached_pages(args.limit)
+    origin = "HTTP-кеш"
+    if not pages:
+        pages = build_pages_from_corpus(args.limit)
+        origin = f"шаблон из {CORPUS_DIR}"
+    if not pages:
+        print("Нет страниц для теста.")
+        return
+
+    total_mb = sum(len(html.encode("utf-8")) for _, html in pages) / 1e6
+    print(f"Страниц: {len(pages)} ({origin}), {total_mb:.1f} MB, раундов: {args.rounds}\n")
+    print(f"{'parser':<14}{'pages/s':>10}{'MB/s':>8}{'text ==':>10}{'image ==':>10}")
+
+    reference = None
+    for parser in args.parsers:
+        try:
+            elapsed, results = run_parser(parser, pages, args.rounds)
+        except FeatureNotFound:
+            print(f"{parser:<14} не установлен")
+            continue
+        if reference is None:
+            reference = results
+        same_text = sum(a[0] == b[0] for a, b in zip(results, reference)) / len(pages)
+        same_img = sum(a[1] == b[1] for a, b in zip(results, reference)) / len(pages)
+        n = len(pages) * args.rounds
+        print(
+            f"{parser:<14}{n / elapsed:>10.1f}{total_mb * args.rounds / elapsed:>8.2f}"
+            f"{same_text:>10.0%}{same_img:>10.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# benchmarks/pipeline_bench.py
+"""
+Офлайн-бенчмарк пайплайна: collect_all → extract_all_articles → cluster_duplicates →
+analyze_articles → build_schedule на записанных лентах, страницах и картинках,
+которые отдаёт локальный HTTP-сервер (по серверу на каждый источник RSS_SOURCES).
+
+    python -m benchmarks.pipeline_bench --sizes 30 90 150 --repeat 3
+    python -m benchmarks.pipeline_bench --output benchmarks/baseline.json
+    python -m benchmarks.pipeline_bench --compare benchmarks/baseline.json
+
+Корпус — тексты архива benchmarks/corpus (utils.article_store): из них собираются
+страницы (шаблон parser_bench), ленты RSS и картинки; каждая четвёртая статья ссылается на общий баннер.
+Каждый прогон идёт в отдельном процессе во временном каталоге со своей базой и кешем,
+поэтому рабочие data/ и Telegram не затрагиваются.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+ROOT = Path(__file__).resolve().parents[1]
+CORPUS_DIR = ROOT / "benchmarks" / "corpus"
+RESULTS_DIR = ROOT / "data" / "bench"
+STAGES = ["collect", "extract", "dedup", "analyze", "schedule"]
+DEFAULT_SIZES = [30, 90, 150]
+
+
+# === Корпус и записанные ответы ===
+
+def load_corpus(size: int) -> list[tuple[str, str]]:
+    """[(id, текст)] из архива корпуса; при нехватке тексты повторяются под новыми id."""
+    from utils.article_store import read_texts
+
+    texts = read_texts(CORPUS_DIR)
+    if not texts:
+        raise SystemExit(f"Корпус пуст: {CORPUS_DIR}")
+    corpus = []
+    for i in range(size):
+        news_id, text = texts[i % len(texts)]
+        corpus.append((news_id if i < len(texts) else f"{news_id}-{i // len(texts)}", text))
+    return corpus
+
+
+def make_image(seed: int) -> bytes:
+    """JPEG 1600×900, разный для разных seed — нормализации есть что уменьшать."""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (1600, 900), ((seed * 37) % 256, (seed * 91) % 256, (seed * 53) % 256))
+    draw = ImageDraw.Draw(img)
+    for k in range(12):
+        x = (seed * 131 + k * 173) % 1500
+        draw.rectangle([x, k * 70, x + 100 + seed % 200, k * 70 + 60], fill=((k * 40) % 256, 255 - seed % 256, 128))
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+def build_recordings(corpus, n_sources: int) -> list[dict]:
+    """Ответы для каждого источника: путь -> (content-type, тело)."""
+    from benchmarks.parser_bench import PAGE_TEMPLATE
+
+    banner = make_image(0)
+    routes = [{} for _ in range(n_sources)]
+    items = [[] for _ in range(n_sources)]
+    now = datetime.now(timezone.utc)
+
+    for i, (news_id, text) in enumerate(corpus):
+        src = i % n_sources
+        lines = text.splitlines()
+        title = lines[0][:80] if lines else news_id
+        og = f'<meta property="og:image" content="/img/{news_id}.jpg">' if i % 2 == 0 else ""
+        page = PAGE_TEMPLATE.format(
+            title=escape(title), og=og, id=news_id,
+            paragraphs="\n".join(f"<p>{escape(line)}</p>" for line in lines),
+            related="".join(f'<li><a href="/a/{j}">Related story number {j}</a></li>' for j in range(8)),
+        )
+        routes[src][f"/a/{news_id}"] = ("text/html; charset=utf-8", page.encode("utf-8"))
+        image = banner if i % 4 == 0 else make_image(i + 1)
+        routes[src][f"/img/{news_id}.jpg"] = ("image/jpeg", image)
+        routes[src][f"/uploads/{news_id}-hero.jpg"] = ("image/jpeg", image)
+        items[src].append((news_id, title, lines[1] if len(lines) > 1 else "", now - timedelta(seconds=i)))
+
+    for src, entries in enumerate(items):
+        xml_items = "".join(
+            f"<item><title>{escape(title)}</title><link>/a/{news_id}</link>"
+            f"<description>{escape(summary[:300])}</description>"
+            f"<pubDate>{format_datetime(published)}</pubDate><guid>{news_id}</guid></item>"
+            for news_id, title, summary, published in entries
+        )
+        feed = (
+            f'<?xml version="1.0"?><rss version="2.0"><channel><title>Source {src}</title>'
+            f"<link>/</link>{xml_items}</channel></rss>"
+        )
+        routes[src]["/feed.xml"] = ("application/rss+xml", feed.encode("utf-8"))
+    return routes
+
+
+def serve(routes: dict) -> ThreadingHTTPServer:
+    """Локальный HTTP-сервер одного источника на свободном порту."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, как у настоящих сайтов
+
+        def do_GET(self):
+            content_type, body = routes.get(urlparse(self.path).path, ("text/plain", None))
+            self.send_response(200 if body is not None else 404)
+            body = body if body is not None else b"not found"
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# === Один прогон (в отдельном процессе) ===
+
+def run_one(size: int) -> dict:
+    from core import metrics
+    from sources import collector
+    from utils import scheduler
+    from utils.analyzer import analyze_articles
+    from utils.article_extractor import extract_all_articles
+    from utils.dedup import cluster_duplicates
+
+    corpus = load_corpus(size)
+    servers = [serve(r) for r in build_recordings(corpus, len(collector.RSS_SOURCES))]
+    collector.RSS_SOURCES = [f"http://127.0.0.1:{s.server_address[1]}/feed.xml" for s in servers]
+    scheduler.send_schedule_report = lambda plan: None  # никаких сообщений в Telegram
+
+    steps = [
+        ("collect", lambda: collector.collect_all(concurrent=True)),
+        ("extract", extract_all_articles),
+        ("dedup", cluster_duplicates),
+        ("analyze", analyze_articles),
+        ("schedule", scheduler.build_schedule),
+    ]
+    timings = {}
+    started = time.perf_counter()
+    for name, step in steps:
+        t0 = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - t0
+    timings["total"] = time.perf_counter() - started
+
+    counters = metrics.snapshot()["counters"]
+    requests = sum(c["value"] for c in counters if c["name"] == "http_requests_total")
+    for s in servers:
+        s.shutdown()
+    return {"size": size, "seconds": timings, "requests": requests}
+
+
+def run_isolated(size: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONPATH=str(ROOT), DATA_DIR=str(Path(tmp) / "data"))
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.pipeline_bench", "--run-one", str(size)],
+            cwd=tmp, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip()[-2000:])
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# === Сводка и сравнение с базовой линией ===
+
+def summarize(runs: list[dict]) -> dict:
+    return {
+        name: round(statistics.median(r["seconds"][name] for r in runs), 4)
+        for name in STAGES + ["total"]
+    }
+
+
+def print_table(results: dict, baseline: dict | None = None):
+    print(f"{'статей':>7} " + " ".join(f"{name:>10}" for name in STAGES + ["total"]))
+    for size, row in results.items():
+        cells = []
+        for name in STAGES + ["total"]:
+            cell = f"{row['seconds'][name]:.3f}"
+            base = (baseline or {}).get(size, {}).get("seconds", {}).get(name)
+            if base:
+                cell += f" ({(row['seconds'][name] / base - 1) * 100:+.0f}%)"
+            cells.append(f"{cell:>10}")
+        print(f"{size:>7} " + " ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="where to write results (default data/bench/pipeline-<time>.json)")
+    parser.add_argument("--compare", type=Path, help="baseline results file to compare against")
+    parser.add_argument("--run-one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one)))
+        return
+
+    results = {}
+    for size in args.sizes:
+        runs = [run_isolated(size) for _ in range(args.repeat)]
+        results[str(size)] = {"seconds": summarize(runs), "requests": runs[-1]["requests"]}
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))["results"]
+    print_table(results, baseline)
+
+    output = args.output or RESULTS_DIR / f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "results": results,
+    }, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Результаты: {output}")
+
+
+if __name__ == "__main__":
+    main()
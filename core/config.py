@@ -1,19 +1,30 @@
+# core/config.py
+"""
+Настройки окружения. Файл .env из корня проекта читается один раз,
+при первом обращении к env(), а не при импорте: задания, которым токены
+не понадобились (например, постинг, когда ничего не запланировано), его не трогают.
+"""
 import os
-from dotenv import load_dotenv
 from pathlib import Path
-import os
-from dotenv import load_dotenv
-# загружаем .env из корня проекта
-env_path = Path(__file__).resolve().parents[1] / ".env"
-load_dotenv(dotenv_path=env_path)
 
-# === Telegram Tokens ===
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-REPORT_TELEGRAM_TOKEN = os.getenv("REPORT_TELEGRAM_TOKEN")
-TELEGRAM_CHAT = os.getenv("TELEGRAM_CHAT")
+ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+_loaded = False
+
+
+def load_env(reload: bool = False):
+    """reload=True перечитывает .env, перезаписывая уже загруженные значения."""
+    global _loaded
+    if _loaded and not reload:
+        return
+    _loaded = True
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        # в CI переменные приходят из секретов, python-dotenv там не ставится
+        return
+    load_dotenv(dotenv_path=ENV_PATH, override=reload)
+
 
-# === Debug ===
-print("DEBUG CONFIG:")
-print(f"  TELEGRAM_TOKEN = {bool(TELEGRAM_TOKEN)}")
-print(f"  REPORT_TELEGRAM_TOKEN = {bool(REPORT_TELEGRAM_TOKEN)}")
-print(f"  TELEGRAM_CHAT = {TELEGRAM_CHAT}")
\ No newline at end of file
+def env(name: str, default: str | None = None) -> str | None:
+    load_env()
+    return os.getenv(name, default)
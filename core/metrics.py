@@ -0,0 +1,177 @@
+# core/metrics.py
+"""
+Метрики прогона: счётчики, значения и гистограммы с метками.
+Собираются в памяти (потокобезопасно) и в конце прогона пишутся в data/metrics:
+<run>-<время>.json — история для поиска регрессий и медленных лент,
+<run>.prom — последний прогон в текстовом формате Prometheus (textfile collector).
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+from core.logger import log
+
+DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
+METRICS_DIR = DATA_DIR / "metrics"
+METRICS_KEEP_DAYS = int(os.getenv("METRICS_KEEP_DAYS", "30"))
+# границы корзин гистограмм, секунды
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+PREFIX = "itnews_"
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> число
+_gauges = {}
+_histograms = {}  # (name, labels) -> {"buckets": [...], "sum": float, "count": int}
+_started = time.time()
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name: str, value: float, **labels):
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        i = bisect_left(BUCKETS, value)
+        if i < len(BUCKETS):
+            h["buckets"][i] += 1
+        h["sum"] += value
+        h["count"] += 1
+
+
+def dropped(filter_name: str, count: int = 1):
+    """Сколько записей отсеял фильтр (не сегодня, дубликат, лимит источника, ...)."""
+    if count:
+        inc("items_dropped_total", count, filter=filter_name)
+
+
+@contextmanager
+def timer(name: str, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def stage(name: str):
+    """Декоратор: длительность вызова функции идёт в stage_seconds{stage=name}."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer("stage_seconds", stage=name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def reset():
+    """Начинает новый прогон (для демона — перед каждым опросом)."""
+    global _started
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+        _started = time.time()
+
+
+def snapshot() -> dict:
+    with _lock:
+        def rows(store, convert):
+            return [{"name": n, "labels": dict(l), **convert(v)} for (n, l), v in sorted(store.items())]
+
+        return {
+            "started_at": datetime.fromtimestamp(_started).isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "counters": rows(_counters, lambda v: {"value": v}),
+            "gauges": rows(_gauges, lambda v: {"value": v}),
+            "histograms": rows(_histograms, lambda h: {
+                "buckets": dict(zip(map(str, BUCKETS), h["buckets"])),
+                "sum": round(h["sum"], 6), "count": h["count"],
+            }),
+        }
+
+
+def _labels(labels: dict, extra: dict | None = None) -> str:
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in items.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(items, escaped)) + "}"
+
+
+def to_prometheus(data: dict) -> str:
+    lines = []
+    typed = set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for row in data["counters"]:
+        name = PREFIX + row["name"]
+        header(name, "counter")
+        lines.append(f"{name}{_labels(row['labels'])} {row['value']}")
+    for row in data["gauges"]:
+        name = PREFIX + row["name"]
+        header(name, "gauge")
+        lines.append(f"{name}{_labels(row['labels'])} {row['value']}")
+    for row in data["histograms"]:
+        name = PREFIX + row["name"]
+        header(name, "histogram")
+        cumulative = 0
+        for le, count in row["buckets"].items():
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(row['labels'], {'le': le})} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(row['labels'], {'le': '+Inf'})} {row['count']}")
+        lines.append(f"{name}_sum{_labels(row['labels'])} {row['sum']}")
+        lines.append(f"{name}_count{_labels(row['labels'])} {row['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def _prune():
+    cutoff = time.time() - METRICS_KEEP_DAYS * 86400
+    for path in METRICS_DIR.glob("*-*.json"):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+
+
+def write(run: str) -> Path | None:
+    """Пишет метрики прогона run (collect, post, daemon) в JSON и Prometheus-файл."""
+    data = {"run": run, **snapshot()}
+    try:
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        json_path = METRICS_DIR / f"{run}-{stamp}.json"
+        json_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        prom_path = METRICS_DIR / f"{run}.prom"
+        tmp = prom_path.with_suffix(".prom.part")
+        tmp.write_text(to_prometheus(data), encoding="utf-8")
+        os.replace(tmp, prom_path)  # textfile collector не должен увидеть файл наполовину
+        _prune()
+    except OSError as e:
+        log.warning(f"⚠️ Не удалось записать метрики: {e}")
+        return None
+    log.info(f"📈 Метрики прогона записаны в {json_path}")
+    return json_path
@@ -0,0 +1,475 @@
+# core/storage.py
+"""
+Хранилище состояния пайплайна на SQLite.
+Таблицы: items (все собранные новости), articles (метаданные извлечённых текстов),
+clusters (почти-дубликаты одной истории), selected (дневной отбор), schedule (план публикаций), sent (отправленные посты),
+send_log (журнал попыток отправки, только дозапись),
+tg_files (file_id уже загруженных в Telegram картинок),
+images (нормализованные картинки по перцептивному хэшу).
+JSON-файлы в data/ остаются только как экспорт текущего прогона.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from core.logger import log
+
+DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
+DB_PATH = DATA_DIR / "state.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    summary TEXT,
+    source TEXT,
+    published_at TEXT,
+    image_path TEXT,
+    collected_on TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_collected_source ON items(collected_on, source);
+
+CREATE TABLE IF NOT EXISTS articles (
+    id TEXT PRIMARY KEY,
+    source TEXT,
+    char_count INTEGER NOT NULL,
+    word_count INTEGER,
+    content_hash TEXT,
+    location TEXT,
+    extracted_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS clusters (
+    id TEXT PRIMARY KEY,
+    cluster_id TEXT NOT NULL,
+    representative INTEGER NOT NULL,
+    day TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_clusters_day ON clusters(day, cluster_id);
+
+CREATE TABLE IF NOT EXISTS selected (
+    day TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    score REAL,
+    PRIMARY KEY (day, id)
+);
+
+CREATE TABLE IF NOT EXISTS schedule (
+    id TEXT PRIMARY KEY,
+    post_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_schedule_time ON schedule(post_time);
+
+CREATE TABLE IF NOT EXISTS sent (
+    id TEXT PRIMARY KEY,
+    sent_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tg_files (
+    content_hash TEXT PRIMARY KEY,
+    file_id TEXT NOT NULL,
+    uploaded_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS images (
+    phash TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    bytes INTEGER,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS send_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    at TEXT NOT NULL,
+    detail TEXT
+);
+"""
+
+SEND_LOG_KEEP_DAYS = 30
+
+# колонки, добавленные после первой версии схемы: (таблица, колонка, тип)
+ADDED_COLUMNS = [
+    ("articles", "word_count", "INTEGER"),
+    ("articles", "content_hash", "TEXT"),
+    ("articles", "source", "TEXT"),
+    ("articles", "location", "TEXT"),
+    ("selected", "score", "REAL"),
+]
+
+# колонки, которые больше не используются: (таблица, колонка)
+DROPPED_COLUMNS = [
+    ("articles", "mtime"),  # время файла .txt — тексты теперь в архиве, версия в location
+]
+
+ITEM_FIELDS = ("id", "title", "url", "summary", "source", "published_at", "image_path")
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def connect() -> sqlite3.Connection:
+    """Соединение с базой для текущего потока (создаётся при первом обращении)."""
+    global _initialized
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    # FULL: каждый коммит (в т.ч. отметка об отправке) сбрасывается на диск через fsync
+    conn.execute("PRAGMA synchronous=FULL")
+    _local.conn = conn
+
+    with _init_lock:
+        if not _initialized:
+            conn.executescript(SCHEMA)
+            _add_missing_columns(conn)
+            _drop_old_columns(conn)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source)")
+            _migrate_json(conn)
+            _initialized = True
+    return conn
+
+
+def today() -> str:
+    return date.today().isoformat()
+
+
+def _add_missing_columns(conn: sqlite3.Connection):
+    """Догоняет схему базы, созданной старой версией кода."""
+    for table, column, col_type in ADDED_COLUMNS:
+        existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+
+
+def _drop_old_columns(conn: sqlite3.Connection):
+    for table, column in DROPPED_COLUMNS:
+        existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+        if column in existing:
+            conn.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+
+
+def _migrate_json(conn: sqlite3.Connection):
+    """Однократный импорт старых JSON-файлов в пустую базу."""
+    if conn.execute("SELECT 1 FROM items LIMIT 1").fetchone() is None:
+        news_path = DATA_DIR / "news.json"
+        if news_path.exists():
+            try:
+                data = json.loads(news_path.read_text(encoding="utf-8"))
+                items = data.get("items", []) if isinstance(data, dict) else data
+                collected_on = (data.get("collected_at") or today())[:10] if isinstance(data, dict) else today()
+                save_items(items, collected_on, conn=conn)
+                log.info(f"📦 Импортировано {len(items)} новостей из {news_path}")
+            except Exception as e:
+                log.warning(f"⚠️ Не удалось импортировать {news_path}: {e}")
+
+    if conn.execute("SELECT 1 FROM sent LIMIT 1").fetchone() is None:
+        sent_path = DATA_DIR / "sent_news.json"
+        if sent_path.exists():
+            try:
+                ids = json.loads(sent_path.read_text(encoding="utf-8"))
+                now = datetime.now().isoformat(timespec="seconds")
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO sent (id, sent_at) VALUES (?, ?)",
+                        [(i, now) for i in ids],
+                    )
+                log.info(f"📦 Импортировано {len(ids)} отправленных из {sent_path}")
+            except Exception as e:
+                log.warning(f"⚠️ Не удалось импортировать {sent_path}: {e}")
+
+
+# === Новости ===
+
+def save_items(items: list[dict], collected_on: str | None = None, conn=None):
+    conn = conn or connect()
+    collected_on = collected_on or today()
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO items (id, title, url, summary, source, published_at, image_path, collected_on) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [tuple(item.get(f) for f in ITEM_FIELDS) + (collected_on,) for item in items],
+        )
+
+
+def known_ids(ids) -> set[str]:
+    """Какие из переданных id уже есть в базе (индексный поиск по первичному ключу)."""
+    ids = list(ids)
+    found = set()
+    conn = connect()
+    # SQLite ограничивает число параметров в запросе
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        rows = conn.execute(f"SELECT id FROM items WHERE id IN ({marks})", chunk)
+        found.update(r["id"] for r in rows)
+    return found
+
+
+def load_items(collected_on: str | None = None) -> list[dict]:
+    """Новости, собранные в указанный день (по умолчанию — сегодня)."""
+    rows = connect().execute(
+        "SELECT * FROM items WHERE collected_on = ?", (collected_on or today(),)
+    )
+    return [dict(r) for r in rows]
+
+
+# === Извлечённые статьи ===
+
+def save_article_meta(news_id: str, char_count: int, word_count: int | None = None,
+                      content_hash: str | None = None, source: str | None = None,
+                      location: str | None = None):
+    save_article_metas([{
+        "id": news_id, "char_count": char_count, "word_count": word_count,
+        "content_hash": content_hash, "source": source, "location": location,
+    }])
+
+
+def save_article_metas(rows: list[dict]):
+    """
+    Метаданные нескольких статей одной транзакцией (один fsync).
+    location — положение текста в архиве статей («сегмент:смещение»), по нему видно перезапись.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    conn = connect()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO articles "
+            "(id, source, char_count, word_count, content_hash, location, extracted_at) "
+            "VALUES (?, COALESCE(?, (SELECT source FROM items WHERE id = ?)), ?, ?, ?, ?, ?)",
+            [
+                (r["id"], r.get("source"), r["id"], r["char_count"], r.get("word_count"),
+                 r.get("content_hash"), r.get("location"), now)
+                for r in rows
+            ],
+        )
+
+
+def article_index() -> dict[str, dict]:
+    """Весь индекс метаданных статей: id -> строка (без чтения текстов)."""
+    rows = connect().execute("SELECT * FROM articles")
+    return {r["id"]: dict(r) for r in rows}
+
+
+def delete_article_meta(ids):
+    conn = connect()
+    with conn:
+        conn.executemany("DELETE FROM articles WHERE id = ?", [(i,) for i in ids])
+
+
+def has_article(news_id: str) -> bool:
+    return connect().execute("SELECT 1 FROM articles WHERE id = ?", (news_id,)).fetchone() is not None
+
+
+def source_stats(collected_on: str | None = None) -> dict[str, int]:
+    """Число новостей с извлечённым текстом по источникам за день (без дубликатов)."""
+    rows = connect().execute(
+        """
+        SELECT i.source, COUNT(*) AS n
+        FROM items i JOIN articles a ON a.id = i.id
+        WHERE i.collected_on = ? AND a.char_count > 0
+          AND NOT EXISTS (SELECT 1 FROM clusters c WHERE c.id = i.id AND c.representative = 0)
+        GROUP BY i.source
+        """,
+        (collected_on or today(),),
+    )
+    return {r["source"]: r["n"] for r in rows}
+
+
+def load_extracted_items(collected_on: str | None = None, exclude_duplicates: bool = False) -> list[dict]:
+    """
+    Новости за день, для которых есть извлечённый текст, вместе с метаданными статьи.
+    exclude_duplicates=True — без не-представителей кластеров дубликатов.
+    """
+    duplicates_filter = (
+        "AND NOT EXISTS (SELECT 1 FROM clusters c WHERE c.id = i.id AND c.representative = 0)"
+        if exclude_duplicates else ""
+    )
+    rows = connect().execute(
+        f"""
+        SELECT i.*, a.char_count, a.word_count, a.content_hash
+        FROM items i JOIN articles a ON a.id = i.id
+        WHERE i.collected_on = ? AND a.char_count > 0 {duplicates_filter}
+        """,
+        (collected_on or today(),),
+    )
+    return [dict(r) for r in rows]
+
+
+def save_clusters(clusters: list[tuple[str, list[str]]], day: str | None = None):
+    """Сохраняет кластеры дня: [(id представителя, [id всех участников])]."""
+    conn = connect()
+    day = day or today()
+    with conn:
+        conn.execute("DELETE FROM clusters WHERE day = ?", (day,))
+        conn.executemany(
+            "INSERT OR REPLACE INTO clusters (id, cluster_id, representative, day) VALUES (?, ?, ?, ?)",
+            [
+                (member, rep, int(member == rep), day)
+                for rep, members in clusters
+                for member in members
+            ],
+        )
+
+
+# === Отбор и расписание ===
+
+def save_selected(items: list[dict], day: str | None = None):
+    conn = connect()
+    day = day or today()
+    with conn:
+        conn.execute("DELETE FROM selected WHERE day = ?", (day,))
+        conn.executemany(
+            "INSERT INTO selected (day, id, position, score) VALUES (?, ?, ?, ?)",
+            [(day, item["id"], i, item.get("scores", {}).get("total")) for i, item in enumerate(items)],
+        )
+
+
+def load_selected(day: str | None = None) -> list[dict]:
+    rows = connect().execute(
+        """
+        SELECT i.*, COALESCE(a.char_count, 0) AS char_count
+        FROM selected s
+        JOIN items i ON i.id = s.id
+        LEFT JOIN articles a ON a.id = s.id
+        WHERE s.day = ?
+        ORDER BY s.position
+        """,
+        (day or today(),),
+    )
+    return [dict(r) for r in rows]
+
+
+def save_schedule(plan: list[dict], replace_day: str | None = None):
+    """
+    Сохраняет план публикаций (поля id и time в формате "%Y-%m-%d %H:%M").
+    replace_day — план дня строится заново: прежние строки этого дня удаляются
+    в той же транзакции, иначе снятые с плана посты всё равно уйдут.
+    """
+    conn = connect()
+    with conn:
+        if replace_day:
+            conn.execute(
+                "DELETE FROM schedule WHERE post_time >= ? AND post_time < ?",
+                (replace_day, replace_day + "~"),
+            )
+        conn.executemany(
+            "INSERT OR REPLACE INTO schedule (id, post_time) VALUES (?, ?)",
+            [(p["id"], p["time"]) for p in plan],
+        )
+
+
+def load_schedule(day: str | None = None) -> list[dict]:
+    """План публикаций на день вместе с данными новостей, по времени."""
+    day = day or today()
+    rows = connect().execute(
+        """
+        SELECT s.post_time AS time, i.*
+        FROM schedule s JOIN items i ON i.id = s.id
+        WHERE s.post_time >= ? AND s.post_time < ?
+        ORDER BY s.post_time
+        """,
+        (day, day + "~"),
+    )
+    return [dict(r) for r in rows]
+
+
+def due_items(now: str) -> list[dict]:
+    """Запланированные на день now и ещё не отправленные новости, время которых наступило."""
+    day = now[:10]  # "%Y-%m-%d" из "%Y-%m-%d %H:%M"
+    rows = connect().execute(
+        """
+        SELECT s.post_time AS time, i.*
+        FROM schedule s
+        JOIN items i ON i.id = s.id
+        LEFT JOIN sent ON sent.id = s.id
+        WHERE s.post_time >= ? AND s.post_time <= ? AND sent.id IS NULL
+        ORDER BY s.post_time
+        """,
+        (day, now),
+    )
+    return [dict(r) for r in rows]
+
+
+# === Отправка ===
+
+def record_send(news_id: str, ok: bool, detail: str | None = None):
+    """
+    Дописывает событие отправки в журнал; успешная отправка в той же транзакции
+    попадает в sent. Стоимость — одна короткая транзакция, независимо от числа постов.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    conn = connect()
+    with conn:
+        conn.execute(
+            "INSERT INTO send_log (id, event, at, detail) VALUES (?, ?, ?, ?)",
+            (news_id, "sent" if ok else "failed", now, detail),
+        )
+        if ok:
+            conn.execute("INSERT OR IGNORE INTO sent (id, sent_at) VALUES (?, ?)", (news_id, now))
+
+
+def sent_ids() -> set[str]:
+    """Множество отправленных id — загружается один раз при старте постинга."""
+    return {r["id"] for r in connect().execute("SELECT id FROM sent")}
+
+
+def compact_send_log(keep_days: int = SEND_LOG_KEEP_DAYS):
+    """Удаляет старые события журнала и переносит WAL в основной файл базы."""
+    cutoff = (datetime.now() - timedelta(days=keep_days)).isoformat(timespec="seconds")
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM send_log WHERE at < ?", (cutoff,))
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+# === Файлы Telegram ===
+
+def get_file_id(content_hash: str) -> str | None:
+    row = connect().execute("SELECT file_id FROM tg_files WHERE content_hash = ?", (content_hash,)).fetchone()
+    return row["file_id"] if row else None
+
+
+def save_file_id(content_hash: str, file_id: str):
+    conn = connect()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO tg_files (content_hash, file_id, uploaded_at) VALUES (?, ?, ?)",
+            (content_hash, file_id, datetime.now().isoformat(timespec="seconds")),
+        )
+
+
+def forget_file_id(content_hash: str):
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM tg_files WHERE content_hash = ?", (content_hash,))
+
+
+# === Картинки ===
+
+def image_hashes() -> dict[str, str]:
+    """Все сохранённые нормализованные картинки: перцептивный хэш -> путь."""
+    return {r["phash"]: r["path"] for r in connect().execute("SELECT phash, path FROM images")}
+
+
+def save_image(phash: str, path: str, width: int, height: int, size: int):
+    conn = connect()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO images (phash, path, width, height, bytes, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (phash, path, width, height, size, datetime.now().isoformat(timespec="seconds")),
+        )
@@ -1,32 +1,49 @@
 # main.py
+import argparse
+import os
+import signal
+import threading
+import time
 from datetime import datetime
 import pytz
+from core import metrics, storage
+from core.config import load_env
 from core.logger import log
 from sources.collector import collect_all
 from utils.article_extractor import extract_all_articles
+from utils.dedup import cluster_duplicates
 from utils.analyzer import analyze_articles
 from utils.scheduler import build_schedule
 from utils.reporter import send_report
-from utils.post_next import post_next
+from utils.post_next import post_next, publish
+from utils.post_queue import PostQueue
+from utils.post_to_telegram import reset_delivery
 
 tz = pytz.timezone("Europe/Belgrade")
 
+# === Режим демона ===
+POLL_INTERVAL = int(os.getenv("POLL_INTERVAL_MINUTES", "15")) * 60  # секунды между опросами лент
+
 
 def main():
     log.info("=== Сбор и анализ новостей ===")
 
     # 1️⃣ Сбор и анализ
-    collect_all()
+    collect_all(concurrent=True)
     extract_all_articles()
+    cluster_duplicates()
     selected = analyze_articles()
 
     if not selected:
         log.warning("⚠️ Нет статей для публикации.")
+        metrics.write("collect")
         return
 
     # 2️⃣ Планирование публикаций
     build_schedule()
     send_report(selected)
+    metrics.write("collect")
+    metrics.reset()
 
     # 3️⃣ Определяем режим постинга
     now = datetime.now(tz)
@@ -36,7 +53,123 @@ def main():
     else:
         log.info("⚡ Уже после 9:00 — включаем instant постинг (для теста).")
         post_next(instant=True)
+    metrics.write("post")
+
+
+class Daemon:
+    """
+    Один долгоживущий процесс вместо двух кронов: главный поток раз в interval
+    опрашивает ленты и прогоняет только новые записи через извлечение, анализ
+    и build_schedule(incremental=True), а поток постинга отправляет посты из PostQueue.
+    SIGTERM/SIGINT — мягкая остановка (текущая отправка завершается),
+    SIGHUP — перечитать .env и состояние отправок из базы.
+    """
+
+    def __init__(self, interval: int = POLL_INTERVAL):
+        self.interval = interval
+        self.queue = PostQueue()
+        self.sent = storage.sent_ids()
+        self.handled = set()  # id, уже взятые потоком постинга в этом процессе
+        self.lock = threading.Lock()
+        # обработчики сигналов только ставят флаги: брать блокировки в них небезопасно
+        self.stopping = None  # имя сигнала остановки
+        self.reload_requested = False
+
+    def request_stop(self, signum, frame):
+        self.stopping = signal.Signals(signum).name
+        # повторный сигнал прервёт процесс сразу
+        signal.signal(signum, signal.SIG_DFL)
+
+    def request_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def _send(self, item):
+        with self.lock:
+            if item["id"] in self.sent:
+                return True
+            # пост остаётся за потоком постинга и при неудаче: повтор ставит сама очередь
+            self.handled.add(item["id"])
+        return publish(item, self.sent)
+
+    def sync_queue(self):
+        """Ставит в очередь (или переносит) сегодняшние неотправленные посты из базы."""
+        with self.lock:
+            for item in storage.load_schedule():
+                if item["id"] in self.sent:
+                    self.queue.cancel(item["id"])
+                    continue
+                if item["id"] in self.handled:
+                    continue
+                post_time = tz.localize(datetime.strptime(item["time"], "%Y-%m-%d %H:%M"))
+                self.queue.add(item, post_time.timestamp())
+        log.info(f"🕒 В очереди {len(self.queue)} постов.")
+
+    def reload(self):
+        log.info("🔄 Перечитываем .env и состояние отправок")
+        load_env(reload=True)
+        reset_delivery()
+        self.sent = storage.sent_ids()
+        self.sync_queue()
+
+    def poll(self):
+        """Один инкрементальный проход: новые записи лент → тексты → отбор → дополнение плана."""
+        metrics.reset()
+        new_items = collect_all(concurrent=True)
+        if new_items and not self.stopping:
+            extract_all_articles()
+            cluster_duplicates()
+            if analyze_articles() and not self.stopping:
+                build_schedule(incremental=True)
+        self.sync_queue()
+        storage.compact_send_log()
+        metrics.write("daemon")
+
+    def run(self):
+        log.info(f"🛰 Демон запущен: опрос лент каждые {self.interval // 60} мин")
+        self.sync_queue()
+        poster = threading.Thread(
+            target=self.queue.run, args=(self._send,), kwargs={"until_empty": False}, name="poster"
+        )
+        poster.start()
+
+        next_poll = time.monotonic()
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            if time.monotonic() >= next_poll:
+                try:
+                    self.poll()
+                except Exception as e:
+                    log.exception(f"❌ Ошибка цикла опроса: {e}")
+                next_poll = time.monotonic() + self.interval
+            # короткий сон: флаги сигналов проверяются не реже раза в секунду
+            time.sleep(min(1.0, max(0.0, next_poll - time.monotonic())))
+
+        log.info(f"🛑 Получен {self.stopping} — дожидаемся текущей отправки и останавливаемся")
+        self.queue.stop()
+        poster.join()
+        self.queue.log_lateness()
+        storage.compact_send_log()
+        log.info("👋 Демон остановлен")
+
+
+def run_daemon(interval: int = POLL_INTERVAL):
+    daemon = Daemon(interval)
+    signal.signal(signal.SIGTERM, daemon.request_stop)
+    signal.signal(signal.SIGINT, daemon.request_stop)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, daemon.request_reload)
+    daemon.run()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Collect, rank and post IT news")
+    parser.add_argument("--daemon", action="store_true", help="keep running: poll feeds and post continuously")
+    parser.add_argument("--interval", type=int, default=POLL_INTERVAL // 60, help="feed polling interval, minutes")
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon(args.interval * 60)
+    else:
+        main()
@@ -1,13 +1,25 @@
 import os
 import json
 import random
-from datetime import datetime, timedelta, timezone, date
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, date
 from pathlib import Path
+from urllib.parse import urlparse
 import math
+import threading
+import time
 
+from core import metrics, storage
 from core.logger import log
+from sources.feed_cache import get_feed_state, update_feed_state
 from sources.rss import fetch_rss
-from utils.helpers import generate_id, fetch_main_image, download_image
+from utils.helpers import generate_id, download_image, fetch_main_image, fetch_page
+from utils.article_extractor import process_page, save_article_texts, MIN_TEXT_LENGTH
+from utils.http_cache import log_cache_stats
+from utils.http_client import log_client_stats
+from utils.images import normalize_images
+from utils.parse_pool import ParsePool
 
 
 
@@ -16,7 +28,19 @@ from utils.helpers import generate_id, fetch_main_image, download_image
 DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
 IMG_DIR = DATA_DIR / "images"
 NEWS_PATH = DATA_DIR / "news.json"
-SCHEDULE_FILE = Path("data/schedule.json")
+
+# === Параллельный сбор ===
+COLLECT_CONCURRENCY = int(os.getenv("COLLECT_CONCURRENCY", "16"))  # всего запросов одновременно
+COLLECT_PER_HOST = int(os.getenv("COLLECT_PER_HOST", "4"))  # запросов к одному хосту
+# 1 — при сборе страница качается целиком и текст сохраняется сразу;
+# 0 — читается только <head> ради og:image, текст позже извлекает extract_all_articles
+COLLECT_ARTICLE_TEXT = os.getenv("COLLECT_ARTICLE_TEXT", "1") == "1"
+
+# водяные отметки лент, которые запишутся в feed_state после сохранения прогона
+_pending_marks = {}
+# тексты, извлечённые при сборе: пишутся в архив одним пакетом (см. flush_texts)
+_pending_texts = {}
+_texts_lock = threading.Lock()
 
 RSS_SOURCES = [
     "https://www.theverge.com/rss/index.xml",
@@ -37,40 +61,41 @@ RSS_SOURCES = [
 
 ]
 
-def build_schedule(news_count, start_hour=5, end_hour=22):
-    """Создаёт расписание постинга на день."""
-    start = datetime.combine(datetime.today(), datetime.min.time()).replace(hour=start_hour)
-    total_minutes = (end_hour - start_hour) * 60
-    if news_count == 0:
-        return []
-    interval = total_minutes / news_count
+def safe_fetch_image(url, news_id, source=None):
+    """
+    Безопасно получает ссылку на главное изображение.
+    Страница качается один раз: текст статьи сохраняется сразу же,
+    чтобы extract_all_articles не загружал её повторно.
+    При COLLECT_ARTICLE_TEXT=0 читается только <head> страницы.
+    """
+    try:
+        if not COLLECT_ARTICLE_TEXT:
+            return fetch_main_image(url)
+        img_url, text = process_page(url)
+    except Exception as e:
+        log.warning(f"⚠️ Ошибка поиска изображения: {e}")
+        return None
 
-    times = [start + timedelta(minutes=i * interval) for i in range(news_count)]
-    schedule = [t.strftime("%H:%M") for t in times]
+    store_text(news_id, text, source)
+    return img_url
 
-    SCHEDULE_FILE.write_text(json.dumps(schedule, indent=2), encoding="utf-8")
-    log.info(f"🕒 Сформировано расписание из {len(schedule)} публикаций каждые {interval:.1f} мин.")
-    return schedule
 
-def load_existing_ids():
-    """Загружает уже собранные новости (для защиты от дублей)."""
-    if NEWS_PATH.exists():
-        try:
-            with open(NEWS_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return {item["id"] for item in data.get("items", [])}
-        except Exception as e:
-            log.warning(f"⚠️ Не удалось загрузить {NEWS_PATH}: {e}")
-    return set()
+def store_text(news_id, text, source=None):
+    """Откладывает текст статьи, извлечённый при сборе, если он не слишком короткий."""
+    if text and len(text) >= MIN_TEXT_LENGTH:
+        with _texts_lock:
+            _pending_texts[news_id] = (text, source)
 
 
-def safe_fetch_image(url):
-    """Безопасно получает ссылку на главное изображение."""
+def flush_texts():
+    """Пишет отложенные тексты прогона: одна дозапись в архив и одна транзакция метаданных."""
+    with _texts_lock:
+        texts = dict(_pending_texts)
+        _pending_texts.clear()
     try:
-        return fetch_main_image(url)
+        save_article_texts(texts)
     except Exception as e:
-        log.warning(f"⚠️ Ошибка поиска изображения: {e}")
-        return None
+        log.warning(f"⚠️ Не удалось сохранить {len(texts)} текстов статей: {e}")
 
 
 def is_today(published_at):
@@ -82,62 +107,222 @@ def is_today(published_at):
         return False
 
 
-def collect_from_source(src):
-    """Собирает новости за сегодня из одного RSS-источника."""
-    collected = []
+def fetch_today_items(src):
+    """Загружает RSS-ленту и оставляет только сегодняшние записи."""
     try:
         items = fetch_rss(src)
     except Exception as e:
         log.error(f"❌ Ошибка при парсинге {src}: {e}")
-        return collected
+        return []
 
     if not items:
         log.warning(f"⚠️ Пустой RSS: {src}")
-        return collected
+        return []
 
     today_items = [n for n in items if is_today(n.get("published_at", ""))]
     log.info(f"📡 {src} → найдено {len(today_items)} новостей за сегодня")
+    with_url = [n for n in today_items if n.get("url")]
+    metrics.dropped("not_today", len(items) - len(today_items))
+    metrics.dropped("no_url", len(today_items) - len(with_url))
+    return skip_known(src, with_url)
+
+
+def _entry_key(news):
+    return news.get("guid") or news["url"]
+
+
+def skip_known(src, items):
+    """
+    Оставляет только новые записи, до любых загрузок страниц и картинок.
+    В упорядоченной по дате ленте записи старше водяной отметки (последней
+    увиденной записи) отбрасываются сразу; остальные сверяются с базой по id.
+    """
+    if not items:
+        return items
+    state = get_feed_state(src)
+    mark = state.get("watermark") or {}
+    newest = max(items, key=lambda n: n.get("published_at", ""))
+    _pending_marks[src] = {"id": _entry_key(newest), "published_at": newest.get("published_at", "")}
+
+    candidates = items
+    if state.get("ordered") and mark.get("published_at"):
+        candidates = [
+            n for n in items
+            if _entry_key(n) != mark.get("id") and n.get("published_at", "") >= mark["published_at"]
+        ]
+        metrics.dropped("below_watermark", len(items) - len(candidates))
+
+    known = storage.known_ids(generate_id(n["url"]) for n in candidates)
+    fresh = [n for n in candidates if generate_id(n["url"]) not in known]
+    metrics.dropped("known_id", len(candidates) - len(fresh))
+    if len(fresh) < len(items):
+        log.info(f"⏭ {src}: новых записей {len(fresh)} из {len(items)}")
+    return fresh
+
+
+def commit_watermarks():
+    """Сдвигает водяные отметки лент — только после того, как записи сохранены в базе."""
+    for src, mark in _pending_marks.items():
+        update_feed_state(src, watermark=mark)
+    _pending_marks.clear()
+
+
+def build_item(news, src, img_path):
+    """Формирует итоговую запись новости для news.json."""
+    url = news["url"]
+    return {
+        "id": generate_id(url),
+        "title": news.get("title", "").strip(),
+        "url": url,
+        "summary": news.get("summary", "")[:600],
+        "source": news.get("source", src),
+        "published_at": news.get("published_at") or datetime.utcnow().isoformat(),
+        "image_path": str(img_path) if img_path else None,
+    }
 
-    for news in today_items:
-        url = news.get("url")
-        if not url:
-            continue
 
+def log_image_result(title, img_url, img_path):
+    if not img_url:
+        log.warning(f"⚠️ Изображение не найдено: {title}")
+    elif img_path:
+        log.info(f"🖼 {title[:60]}... — изображение сохранено")
+    else:
+        log.warning(f"⚠️ Не удалось скачать изображение: {title}")
+
+
+def _source_done(src, started, collected):
+    """Метрики одного источника: время сбора и число записей, метка — хост ленты."""
+    feed = urlparse(src).netloc
+    metrics.observe("source_collect_seconds", time.perf_counter() - started, feed=feed)
+    metrics.inc("items_collected_total", len(collected), feed=feed)
+    metrics.inc("images_saved_total", sum(1 for n in collected if n["image_path"]), feed=feed)
+
+
+def collect_from_source(src):
+    """Собирает новости за сегодня из одного RSS-источника."""
+    started = time.perf_counter()
+    collected = []
+    for news in fetch_today_items(src):
         title = news.get("title", "").strip()
-        summary = news.get("summary", "")
-        published = news.get("published_at") or datetime.utcnow().isoformat()
-        source = news.get("source", src)
-        news_id = generate_id(url)
+        news_id = generate_id(news["url"])
 
         # Ищем изображение
-        img_url = safe_fetch_image(url)
-        img_path = None
-        if img_url:
-            img_path = download_image(img_url, IMG_DIR, news_id)
-            if img_path:
-                log.info(f"🖼 {title[:60]}... — изображение сохранено")
-            else:
-                log.warning(f"⚠️ Не удалось скачать изображение: {title}")
-        else:
-            log.warning(f"⚠️ Изображение не найдено: {title}")
-
-        collected.append({
-            "id": news_id,
-            "title": title,
-            "url": url,
-            "summary": summary[:600],
-            "source": source,
-            "published_at": published,
-            "image_path": str(img_path) if img_path else None,
-        })
+        img_url = safe_fetch_image(news["url"], news_id, news.get("source", src))
+        img_path = download_image(img_url, IMG_DIR, news_id) if img_url else None
+        log_image_result(title, img_url, img_path)
+
+        collected.append(build_item(news, src, img_path))
+
+    _source_done(src, started, collected)
+    return collected
 
+
+class HostLimiter:
+    """
+    Ограничивает параллельные запросы: глобально и отдельно для каждого хоста.
+    Блокирующие функции (requests) выполняются в пуле потоков.
+    """
+
+    def __init__(self, executor, total=COLLECT_CONCURRENCY, per_host=COLLECT_PER_HOST):
+        self.executor = executor
+        self.total = asyncio.Semaphore(total)
+        self.per_host = per_host
+        self.hosts = {}
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        if host not in self.hosts:
+            self.hosts[host] = asyncio.Semaphore(self.per_host)
+        return self.hosts[host]
+
+    async def run(self, url, func, *args):
+        # сначала слот хоста, потом глобальный — чтобы не держать общий слот в очереди к занятому хосту
+        async with self._host_semaphore(url):
+            async with self.total:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.executor, func, *args)
+
+
+async def _fetch_and_parse_async(url, news_id, source, limiter, parser):
+    """Страница качается в потоке, разбирается в процессе пула; возвращает url картинки."""
+    async with parser.slot():
+        html, base_url = await limiter.run(url, fetch_page, url)
+        if not html:
+            return None
+        try:
+            img_url, text = await parser.parse(html, base_url or url)
+        except Exception as e:
+            log.warning(f"⚠️ Ошибка разбора {url}: {e}")
+            return None
+    store_text(news_id, text, source)  # только в память — на диск пишет flush_texts
+    return img_url
+
+
+async def _collect_item_async(news, src, limiter, parser=None):
+    title = news.get("title", "").strip()
+    news_id = generate_id(news["url"])
+
+    if parser is not None:
+        img_url = await _fetch_and_parse_async(news["url"], news_id, news.get("source", src), limiter, parser)
+    else:
+        img_url = await limiter.run(
+            news["url"], safe_fetch_image, news["url"], news_id, news.get("source", src)
+        )
+    img_path = None
+    if img_url:
+        img_path = await limiter.run(img_url, download_image, img_url, IMG_DIR, news_id)
+    log_image_result(title, img_url, img_path)
+
+    return build_item(news, src, img_path)
+
+
+async def collect_from_source_async(src, limiter, parser=None):
+    """Асинхронный вариант collect_from_source: страницы и картинки качаются параллельно."""
+    started = time.perf_counter()
+    today_items = await limiter.run(src, fetch_today_items, src)
+    results = await asyncio.gather(
+        *(_collect_item_async(news, src, limiter, parser) for news in today_items),
+        return_exceptions=True,
+    )
+
+    collected = []
+    for news, res in zip(today_items, results):
+        if isinstance(res, Exception):
+            log.warning(f"⚠️ Ошибка обработки {news.get('url')}: {res}")
+            metrics.dropped("fetch_error")
+            # запись не сохранена — отметку не сдвигаем, чтобы она пришла в следующий раз
+            _pending_marks.pop(src, None)
+            continue
+        collected.append(res)
+    _source_done(src, started, collected)
     return collected
 
 
+async def _gather_sources(parser=None):
+    with ThreadPoolExecutor(max_workers=COLLECT_CONCURRENCY) as executor:
+        limiter = HostLimiter(executor)
+        return await asyncio.gather(
+            *(collect_from_source_async(src, limiter, parser) for src in RSS_SOURCES)
+        )
+
+
+async def collect_all_async():
+    """
+    Собирает все RSS_SOURCES одновременно с глобальным и per-host лимитом.
+    Потоки только качают; HTML разбирается в пуле процессов (utils.parse_pool).
+    """
+    if not COLLECT_ARTICLE_TEXT:
+        return await _gather_sources()
+    # процессы разбора стартуют при первой новой странице (forkserver) — см. ParsePool
+    with ParsePool() as parser:
+        return await _gather_sources(parser)
+
+
 def save_to_json(items):
-    """Сохраняет результат в JSON с метаданными."""
+    """Сохраняет новости в базу и экспорт прогона в JSON с метаданными."""
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     IMG_DIR.mkdir(parents=True, exist_ok=True)
+    storage.save_items(items)
 
     output = {
         "collected_at": datetime.now(timezone.utc).isoformat(),
@@ -151,21 +336,38 @@ def save_to_json(items):
     log.info(f"✅ Сохранено {len(items)} новостей в {NEWS_PATH.resolve()}")
 
 
-def collect_all():
-    """Основная функция: сбор только сегодняшних новостей."""
+@metrics.stage("collect")
+def collect_all(concurrent=False):
+    """
+    Основная функция: сбор только сегодняшних новостей.
+    concurrent=True — все источники, страницы и картинки загружаются параллельно.
+    """
     log.info("🚀 Старт сбора новостей за сегодня")
-    existing_ids = load_existing_ids()
+    if concurrent:
+        per_source = asyncio.run(collect_all_async())
+    else:
+        per_source = [collect_from_source(src) for src in RSS_SOURCES]
+    flush_texts()
+
+    # защита от дублей: один индексный запрос к базе вместо чтения всего news.json
+    existing_ids = storage.known_ids(item["id"] for items in per_source for item in items)
     all_news = []
 
-    for src in RSS_SOURCES:
-        source_news = collect_from_source(src)
+    # порядок источников сохраняется, поэтому дедупликация совпадает с последовательным режимом
+    for source_news in per_source:
         for item in source_news:
             if item["id"] not in existing_ids:
                 all_news.append(item)
                 existing_ids.add(item["id"])
+            else:
+                metrics.dropped("already_collected")
 
     random.shuffle(all_news)
     log.info(f"✅ Итого собрано: {len(all_news)} новостей за сегодня")
+    # CPU-этап после загрузок: уменьшение, сжатие и склейка одинаковых картинок
+    normalize_images(all_news)
     save_to_json(all_news)
-    build_schedule(len(all_news))
-    return all_news
\ No newline at end of file
+    commit_watermarks()
+    log_cache_stats()
+    log_client_stats()
+    return all_news
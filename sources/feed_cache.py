@@ -0,0 +1,52 @@
+# sources/feed_cache.py
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from core.logger import log
+
+# === Хранилище валидаторов RSS-лент (ETag / Last-Modified / хеш тела) ===
+DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
+FEED_STATE_FILE = DATA_DIR / "feed_state.json"
+
+_lock = threading.Lock()
+_state = None
+
+
+def _load():
+    global _state
+    if _state is None:
+        _state = {}
+        if FEED_STATE_FILE.exists():
+            try:
+                _state = json.loads(FEED_STATE_FILE.read_text(encoding="utf-8"))
+            except Exception as e:
+                log.warning(f"⚠️ Не удалось загрузить {FEED_STATE_FILE}: {e}")
+    return _state
+
+
+def _save():
+    FEED_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = FEED_STATE_FILE.with_suffix(".json.part")
+    tmp.write_text(json.dumps(_state, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, FEED_STATE_FILE)
+
+
+def body_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def get_feed_state(feed_url: str) -> dict:
+    """Возвращает копию сохранённого состояния ленты (или пустой dict)."""
+    with _lock:
+        return dict(_load().get(feed_url, {}))
+
+
+def update_feed_state(feed_url: str, **fields):
+    """Обновляет состояние ленты и сразу сохраняет файл (атомарно)."""
+    with _lock:
+        state = _load()
+        state.setdefault(feed_url, {}).update(fields)
+        _save()
@@ -1,18 +1,185 @@
 import feedparser
 from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from xml.parsers import expat
+from core import metrics
 from core.logger import log
+from sources.feed_cache import body_hash, get_feed_state, update_feed_state
+from utils import http_client
 
+# === Потоковое чтение ленты ===
+ENTRY_TAGS = {"item", "entry"}  # RSS / RDF и Atom
+DATE_TAGS = {"pubDate", "published", "updated", "date"}  # date — dc:date
+STALE_RUN = 2  # столько записей подряд старше окна в упорядоченной ленте — дальше не читаем
+# Выход по дате применяется только к лентам, которые при прошлом чтении были
+# упорядочены по убыванию даты (поле ordered в состоянии ленты).
 
-def fetch_rss(feed_url: str, limit: int = 20, hours_back: int = 24):
+
+class _StopFeed(Exception):
+    pass
+
+
+class _EntryScanner:
     """
-    Загружает новости из RSS-ленты, фильтрует по дате (за последние X часов)
-    и возвращает список словарей.
+    Находит границы записей в потоке байтов ленты (expat), не разбирая их содержимое.
+    Останавливается после limit записей или (если передан cutoff) когда в упорядоченной
+    по дате ленте пошли записи старше cutoff; cut — байтовое смещение конца последней
+    прочитанной записи, ordered — были ли прочитанные записи упорядочены.
     """
-    log.info(f"Fetching RSS: {feed_url}")
-    feed = feedparser.parse(feed_url)
-    articles = []
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours_back)
 
+    def __init__(self, limit: int, cutoff: datetime | None):
+        self.limit = limit
+        self.cutoff = cutoff
+        self.parser = expat.ParserCreate()
+        self.parser.StartElementHandler = self._start
+        self.parser.EndElementHandler = self._end
+        self.parser.CharacterDataHandler = self._chars
+        self.stack = []
+        self.entry_depth = None
+        self.date_parts = None
+        self.entry_date = None
+        self.count = 0
+        self.last_date = None
+        self.ordered = True
+        self.stale = 0
+        self.cut = None
+        self.open_tags = None
+        self.reason = None
+
+    @staticmethod
+    def _local(name: str) -> str:
+        return name.rsplit(":", 1)[-1]
+
+    def _start(self, name, attrs):
+        self.stack.append(name)
+        local = self._local(name)
+        if self.entry_depth is None and local in ENTRY_TAGS:
+            self.entry_depth = len(self.stack)
+            self.entry_date = None
+        elif self.entry_depth is not None and local in DATE_TAGS and self.entry_date is None:
+            self.date_parts = []
+
+    def _chars(self, data):
+        if self.date_parts is not None:
+            self.date_parts.append(data)
+
+    def _end(self, name):
+        if self.date_parts is not None:
+            self.entry_date = _parse_date("".join(self.date_parts).strip())
+            self.date_parts = None
+        if self.entry_depth == len(self.stack):
+            self.entry_depth = None
+            self._entry_done()
+        self.stack.pop()
+
+    def _entry_done(self):
+        self.count += 1
+        date = self.entry_date
+        if date is not None:
+            if self.last_date is not None and date > self.last_date:
+                self.ordered = False
+            self.last_date = date
+        if self.cutoff is not None and date is not None and date < self.cutoff:
+            self.stale += 1
+        else:
+            self.stale = 0
+
+        if self.count >= self.limit:
+            self.reason = "limit"
+        elif self.ordered and self.stale >= STALE_RUN:
+            self.reason = "cutoff"
+        if self.reason:
+            # CurrentByteIndex указывает на начало закрывающего тега записи
+            self.cut = self.parser.CurrentByteIndex
+            self.open_tags = self.stack[:-1]
+            raise _StopFeed
+
+    def feed(self, chunk: bytes) -> bool:
+        """True — нужные записи уже прочитаны."""
+        try:
+            self.parser.Parse(chunk, False)
+        except _StopFeed:
+            return True
+        return False
+
+
+def _parse_date(text: str) -> datetime | None:
+    try:
+        dt = parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _read_entries(r, limit: int, cutoff: datetime | None):
+    """
+    Читает тело ленты потоком до последней нужной записи.
+    Возвращает корректный XML: прочитанный префикс + закрывающие теги открытых элементов,
+    поэтому feedparser выдаёт для него те же записи, что и для полной ленты.
+    Если лента не разбирается expat (HTML-сущности и т.п.), тело дочитывается целиком.
+    Возвращает (тело, упорядочена ли лента по дате или None, если неизвестно).
+    """
+    scanner = _EntryScanner(limit, cutoff)
+    body = bytearray()
+    stream = r.iter_content(http_client.CHUNK_SIZE)
+    scanning = True
+    for chunk in stream:
+        body += chunk
+        if len(body) > http_client.HTTP_MAX_BYTES:
+            raise http_client.ResponseTooLarge(f"{r.url}: больше {http_client.HTTP_MAX_BYTES} байт", response=r)
+        if not scanning:
+            continue
+        try:
+            done = scanner.feed(chunk)
+        except expat.ExpatError:
+            scanning = False  # дальше просто дочитываем — разберёт feedparser
+            scanner.ordered = None
+            continue
+        if done:
+            end = body.index(b">", scanner.cut) + 1
+            metrics.inc("feed_early_exit_total", reason=scanner.reason)
+            metrics.inc("feed_bytes_total", end)
+            closing = "".join(f"</{name}>" for name in reversed(scanner.open_tags))
+            return bytes(body[:end]) + closing.encode("ascii"), scanner.ordered
+
+    metrics.inc("feed_bytes_total", len(body))
+    return bytes(body), scanner.ordered
+
+
+def _download_feed(feed_url: str, state: dict, limit: int, cutoff: datetime | None = None):
+    """
+    Условный GET ленты. Возвращает (body, response, ordered); body=None,
+    если лента не изменилась (304 или тот же хеш тела).
+    Тело читается потоком и только до limit-й записи (см. _read_entries).
+    """
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+
+    with http_client.stream(feed_url, headers=headers) as r:
+        if r.status_code == 304:
+            return None, r, state.get("ordered")
+        r.raise_for_status()
+        body, ordered = _read_entries(r, limit, cutoff)
+
+    # хеш прочитанной части: у неизменной ленты префикс тот же
+    if body_hash(body) == state.get("body_hash"):
+        return None, r, ordered
+    return body, r, ordered
+
+
+def _parse_entries(body: bytes, response, feed_url: str, limit: int):
+    """Разбирает тело ленты в список словарей (без фильтра по дате)."""
+    feed = feedparser.parse(
+        body,
+        response_headers={**response.headers, "content-location": response.url},
+    )
+    articles = []
     for entry in feed.entries[:limit]:
         # Получаем дату публикации
         published_parsed = getattr(entry, "published_parsed", None)
@@ -21,19 +188,62 @@ def fetch_rss(feed_url: str, limit: int = 20, hours_back: int = 24):
         else:
             pub_date = None
 
-        # Пропускаем старые статьи
-        if pub_date and pub_date < cutoff:
-            continue
-
         # Собираем данные о статье
         article = {
             "title": getattr(entry, "title", "").strip(),
             "url": getattr(entry, "link", "").strip(),
+            "guid": getattr(entry, "id", "") or getattr(entry, "link", "").strip(),
             "summary": getattr(entry, "summary", "")[:500].strip(),
             "published_at": pub_date.isoformat() if pub_date else "",
             "source": feed.feed.get("title", feed_url),
         }
         articles.append(article)
+    return articles
+
+
+def _is_fresh(article: dict, cutoff: datetime) -> bool:
+    if not article["published_at"]:
+        return True
+    return datetime.fromisoformat(article["published_at"]) >= cutoff
+
+
+def fetch_rss(feed_url: str, limit: int = 20, hours_back: int = 24, use_cache: bool = True):
+    """
+    Загружает новости из RSS-ленты, фильтрует по дате (за последние X часов)
+    и возвращает список словарей.
+    При use_cache=True лента перепроверяется условным запросом (ETag / Last-Modified):
+    если она не изменилась, разбор пропускается и используются сохранённые записи.
+    """
+    log.info(f"Fetching RSS: {feed_url}")
+    state = get_feed_state(feed_url) if use_cache else {}
+    if state.get("limit", 0) < limit:
+        # кеш собран с меньшим лимитом — нужна полная загрузка
+        state = {}
+
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours_back)
+    body, response, ordered = _download_feed(
+        feed_url, state, limit, cutoff if state.get("ordered") else None
+    )
+    if body is None:
+        log.info(f"♻️ {feed_url} не изменилась — разбор пропущен")
+        metrics.inc("feed_not_modified_total")
+        entries = state.get("articles", [])[:limit]
+    else:
+        entries = _parse_entries(body, response, feed_url, limit)
+        if use_cache:
+            update_feed_state(
+                feed_url,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                body_hash=body_hash(body),
+                limit=limit,
+                ordered=ordered,
+                articles=entries,
+            )
+
+    # Пропускаем старые статьи
+    articles = [a for a in entries if _is_fresh(a, cutoff)]
+    metrics.dropped("older_than_window", len(entries) - len(articles))
 
     log.info(f"📡 {feed_url} → найдено {len(articles)} новостей за последние {hours_back} ч.")
     return articles
@@ -0,0 +1,11 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# модули читают DATA_DIR при импорте — тесты не должны трогать рабочий data/
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="itnews-tests-"))
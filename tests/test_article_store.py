@@ -0,0 +1,69 @@
+# tests/test_article_store.py
+from utils import article_store
+from utils.article_store import INDEX_NAME, ArticleArchive, migrate, read_texts
+
+
+def test_put_get_round_trip(tmp_path):
+    store = ArticleArchive(tmp_path)
+    store.put("a1", "Привет, мир — ünïcode ✓")
+    assert "a1" in store
+    assert store.get("a1") == "Привет, мир — ünïcode ✓"
+    assert store.get("missing") is None
+
+
+def test_overwrite_last_write_wins(tmp_path):
+    store = ArticleArchive(tmp_path)
+    first = store.put("a1", "old")
+    second = store.put("a1", "new")
+    assert store.get("a1") == "new"
+    assert first != second
+    assert store.location("a1") == second
+    assert len(store) == 1
+
+
+def test_put_many_writes_one_segment_visible_to_other_instance(tmp_path):
+    store = ArticleArchive(tmp_path)
+    locations = store.put_many({f"id{i}": f"text {i}" for i in range(5)})
+    assert set(locations) == {f"id{i}" for i in range(5)}
+    assert store.stats()["segments"] == 1
+
+    other = ArticleArchive(tmp_path)
+    store.put("late", "appended after other was opened")
+    assert other.get("late") == "appended after other was opened"
+    assert sorted(other.ids()) == sorted([*locations, "late"])
+
+
+def test_partial_index_line_is_ignored(tmp_path):
+    ArticleArchive(tmp_path).put("a1", "done")
+    with open(tmp_path / INDEX_NAME, "ab") as f:
+        f.write(b"a2\t0\t")  # оборванная запись
+    store = ArticleArchive(tmp_path)
+    assert store.ids() == ["a1"]
+    assert "a2" not in store
+
+
+def test_segment_rolls_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(article_store, "ARCHIVE_SEGMENT_BYTES", 1)
+    store = ArticleArchive(tmp_path)
+    store.put("a1", "first")
+    store.put("a2", "second")
+    assert store.stats()["segments"] == 2
+    assert store.location("a2").startswith("1:")
+    assert store.get("a1") == "first" and store.get("a2") == "second"
+
+
+def test_read_texts_sees_both_layouts_without_migrating(tmp_path):
+    ArticleArchive(tmp_path).put("packed", "from archive")
+    (tmp_path / "loose.txt").write_text("from file", encoding="utf-8")
+    assert read_texts(tmp_path) == [("loose", "from file"), ("packed", "from archive")]
+    assert (tmp_path / "loose.txt").exists()
+
+
+def test_migrate_moves_txt_files(tmp_path):
+    for i in range(3):
+        (tmp_path / f"n{i}.txt").write_text(f"текст {i}", encoding="utf-8")
+    store = ArticleArchive(tmp_path)
+    assert migrate(store, batch=2) == 3
+    assert not list(tmp_path.glob("*.txt"))
+    assert [store.get(f"n{i}") for i in range(3)] == ["текст 0", "текст 1", "текст 2"]
+    assert migrate(store) == 0
@@ -0,0 +1,44 @@
+# tests/test_dedup.py
+from utils.dedup import find_clusters, minhash, shingles, similarity
+
+STORY = (
+    "Компания выпустила новую версию языка программирования с ускоренным интерпретатором "
+    "поддержкой свободных потоков и улучшенными сообщениями об ошибках разработчики обещают "
+    "что большинство библиотек заработает без изменений а переход займёт несколько месяцев "
+    "в релиз также вошли обновлённый сборщик мусора экспериментальный компилятор и новые "
+    "модули стандартной библиотеки для работы с архивами и сетевыми протоколами"
+)
+REWRITE = STORY.replace("несколько месяцев", "пару месяцев") + " сообщает редакция"
+OTHER = (
+    "Футбольный клуб объявил о подписании контракта с молодым нападающим который провёл "
+    "прошлый сезон в аренде и забил двенадцать мячей в чемпионате страны тренер назвал "
+    "игрока важной частью новой команды а болельщики встретили новость с энтузиазмом"
+)
+
+
+def sig(text):
+    return minhash(shingles(text))
+
+
+def test_minhash_is_deterministic():
+    assert sig(STORY) == sig(STORY)
+    assert similarity(sig(STORY), sig(STORY)) == 1.0
+
+
+def test_near_duplicates_are_similar_and_unrelated_are_not():
+    assert similarity(sig(STORY), sig(REWRITE)) >= 0.7
+    assert similarity(sig(STORY), sig(OTHER)) < 0.2
+
+
+def test_find_clusters_groups_cross_source_duplicates():
+    signatures = {"a": sig(STORY), "b": sig(REWRITE), "c": sig(OTHER)}
+    sources = {"a": "habr", "b": "vc", "c": "habr"}
+    clusters = find_clusters(signatures, sources, threshold=0.5)
+    assert [sorted(c) for c in clusters] == [["a", "b"]]
+
+
+def test_find_clusters_skips_same_source_pairs():
+    signatures = {"a": sig(STORY), "b": sig(REWRITE)}
+    assert find_clusters(signatures, {"a": "habr", "b": "habr"}, threshold=0.5) == []
+    # без sources сравниваются все пары
+    assert len(find_clusters(signatures, threshold=0.5)) == 1
@@ -0,0 +1,111 @@
+# tests/test_post_queue.py
+import threading
+import time
+
+import pytest
+
+from utils import post_queue
+from utils.post_queue import PostQueue
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(post_queue, "POST_RETRY_DELAY", 0)
+    monkeypatch.setattr(post_queue, "POST_RETRY_LIMIT", 3)
+
+
+def item(news_id):
+    return {"id": news_id, "title": news_id}
+
+
+def test_sends_in_due_order_and_returns_when_empty():
+    q = PostQueue()
+    now = time.time()
+    q.add(item("b"), now - 1)
+    q.add(item("a"), now - 2)
+    q.add(item("c"), now + 0.05)
+    sent = []
+    q.run(lambda it: sent.append(it["id"]) or True)
+    assert sent == ["a", "b", "c"]
+    assert len(q) == 0
+
+
+def test_cancel_and_reschedule():
+    q = PostQueue()
+    now = time.time()
+    q.add(item("a"), now - 1)
+    q.add(item("b"), now - 1)
+    q.add(item("a"), now + 0.05)  # перенос: старая запись в куче пропускается
+    assert q.cancel("b")
+    assert not q.cancel("missing")
+    sent = []
+    q.run(lambda it: sent.append(it["id"]) or True)
+    assert sent == ["a"]
+
+
+def test_failed_send_is_retried_until_success():
+    q = PostQueue()
+    q.add(item("a"), time.time())
+    results = iter([False, False, True])
+    calls = []
+
+    def send(it):
+        calls.append(it["id"])
+        return next(results)
+
+    q.run(send)
+    assert calls == ["a", "a", "a"]
+    # опоздание считается один раз — при первой выборке, без повторов
+    assert len(q.lateness) == 1
+
+
+def test_exception_counts_as_failure():
+    q = PostQueue()
+    q.add(item("a"), time.time())
+    calls = []
+
+    def send(it):
+        calls.append(it["id"])
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return True
+
+    q.run(send)
+    assert calls == ["a", "a"]
+
+
+def test_gives_up_after_retry_limit():
+    q = PostQueue()
+    q.add(item("a"), time.time())
+    calls = []
+    q.run(lambda it: calls.append(it["id"]) or False)
+    assert len(calls) == post_queue.POST_RETRY_LIMIT
+    assert len(q) == 0
+
+
+def test_retry_delay_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(post_queue, "POST_RETRY_DELAY", 60)
+    monkeypatch.setattr(post_queue, "POST_RETRY_LIMIT", 10)
+    monkeypatch.setattr(post_queue.time, "time", lambda: 1000.0)
+    q = PostQueue()
+    delays = []
+    for _ in range(6):
+        q._retry(item("a"))
+        delays.append(q._items["a"][0] - 1000.0)
+    assert delays == [60, 120, 240, 480, 900, 900]
+
+
+def test_run_until_stopped_picks_up_new_posts():
+    q = PostQueue()
+    sent = []
+    worker = threading.Thread(target=q.run, args=(lambda it: sent.append(it["id"]) or True,),
+                              kwargs={"until_empty": False})
+    worker.start()
+    q.add(item("a"), time.time())
+    deadline = time.time() + 5
+    while not sent and time.time() < deadline:
+        time.sleep(0.01)
+    q.stop()
+    worker.join(timeout=5)
+    assert sent == ["a"]
+    assert not worker.is_alive()
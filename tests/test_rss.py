@@ -0,0 +1,73 @@
+# tests/test_rss.py
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import feedparser
+
+from sources.rss import _EntryScanner, _read_entries
+
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+
+
+def rss(hours_ago, extra=""):
+    items = "".join(
+        f"<item><title>Item {i}</title><link>https://example.com/{i}</link>"
+        f"<pubDate>{format_datetime(NOW - timedelta(hours=h))}</pubDate>{extra}</item>"
+        for i, h in enumerate(hours_ago)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f"<rss version=\"2.0\"><channel><title>Feed</title>{items}</channel></rss>"
+    ).encode("utf-8")
+
+
+class FakeResponse:
+    """Отдаёт тело мелкими кусками и считает, сколько их было прочитано."""
+
+    url = "https://example.com/feed"
+
+    def __init__(self, body, chunk=64):
+        self.chunks = [body[i:i + chunk] for i in range(0, len(body), chunk)]
+        self.read = 0
+
+    def iter_content(self, size):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+def test_limit_exit_returns_well_formed_prefix():
+    body = rss(range(30))
+    r = FakeResponse(body)
+    prefix, ordered = _read_entries(r, limit=5, cutoff=None)
+
+    assert r.read < len(r.chunks)
+    assert len(prefix) < len(body)
+    parsed = feedparser.parse(prefix)
+    assert not parsed.bozo
+    assert [e.title for e in parsed.entries] == [f"Item {i}" for i in range(5)]
+    assert ordered is True
+
+
+def test_cutoff_exit_on_ordered_feed():
+    scanner = _EntryScanner(limit=100, cutoff=NOW - timedelta(hours=24))
+    assert scanner.feed(rss([1, 5, 10, 30, 40, 50, 60, 70]))
+    assert scanner.reason == "cutoff"
+    assert scanner.count == 5  # три свежих + две устаревших подряд
+
+
+def test_unordered_feed_never_takes_cutoff_exit():
+    r = FakeResponse(rss([1, 30, 2, 40, 50, 60, 70]))
+    body, ordered = _read_entries(r, limit=100, cutoff=NOW - timedelta(hours=24))
+    assert r.read == len(r.chunks)
+    assert ordered is False
+    assert len(feedparser.parse(body).entries) == 7
+
+
+def test_expat_error_reads_whole_feed():
+    # &nbsp; не объявлена в XML — expat падает, feedparser разбирает сам
+    r = FakeResponse(rss(range(10), extra="<description>a&nbsp;b</description>"))
+    body, ordered = _read_entries(r, limit=3, cutoff=None)
+    assert r.read == len(r.chunks)
+    assert ordered is None
+    assert len(feedparser.parse(body).entries) == 10
@@ -0,0 +1,102 @@
+# tests/test_telegram_delivery.py
+import pytest
+from telegram.error import BadRequest, NetworkError, TimedOut
+from telegram.utils.request import urllib3
+
+from utils import telegram_delivery
+from utils.telegram_delivery import REJECTED, TRANSIENT, TelegramDelivery, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(telegram_delivery.time, "monotonic", c)
+    return c
+
+
+def test_bucket_allows_burst_then_spaces_out(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # токенов нет — каждый следующий ждёт ещё 1/rate
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=1, capacity=3)
+    for _ in range(3):
+        bucket.reserve()
+    clock.now += 100  # за это время накопилось бы 100 токенов, но ведро вмещает 3
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_bucket_pause_blocks_until_deadline(clock):
+    bucket = TokenBucket(rate=10, capacity=10)
+    bucket.pause(30)
+    assert bucket.reserve() == pytest.approx(30)
+    clock.now += 30
+    assert bucket.reserve() == 0
+
+
+class FakeBot:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def send_message(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return type("Message", (), {"message_id": 42})()
+
+
+def raised_from(error, cause):
+    try:
+        raise cause
+    except Exception as c:
+        try:
+            raise error from c
+        except Exception as e:
+            return e
+
+
+@pytest.fixture
+def delivery(monkeypatch):
+    monkeypatch.setattr(telegram_delivery, "BACKOFF_BASE", 0)
+    d = TelegramDelivery("token")
+    monkeypatch.setattr(d, "_wait_turn", lambda chat_id: None)
+    return d
+
+
+def test_connection_errors_before_sending_are_retried(delivery):
+    refused = raised_from(NetworkError("refused"), urllib3.exceptions.NewConnectionError(None, "refused"))
+    delivery._bot = FakeBot([refused, refused])
+    result = delivery.send_message(1, "text")
+    assert result.ok and result.message_id == 42
+    assert delivery._bot.calls == 3
+
+
+def test_read_timeout_is_not_retried(delivery):
+    # запрос уже ушёл: Telegram мог опубликовать пост, повтор дал бы дубль
+    timeout = raised_from(TimedOut(), urllib3.exceptions.ReadTimeoutError(None, "url", "read"))
+    delivery._bot = FakeBot([timeout])
+    result = delivery.send_message(1, "text")
+    assert not result.ok and result.kind == TRANSIENT
+    assert delivery._bot.calls == 1
+
+
+def test_bad_request_is_rejected_without_retry(delivery):
+    delivery._bot = FakeBot([BadRequest("wrong file identifier")])
+    result = delivery.send_message(1, "text")
+    assert result.kind == REJECTED
+    assert delivery._bot.calls == 1
@@ -1,56 +1,35 @@
 import json
 from pathlib import Path
-from collections import defaultdict
+from core import metrics, storage
 from core.logger import log  # если используешь свой логгер
+from utils.ranker import rank_articles
 
-NEWS_FILE = Path("data/news.json")
-ARTICLES_DIR = Path("data/articles")
 SELECTED_FILE = Path("data/selected.json")
 
 
+@metrics.stage("analyze")
 def analyze_articles(top_n=3):
-    """Выбирает по top_n самых длинных статей из каждого источника."""
-    if not NEWS_FILE.exists():
-        log.warning(f"⚠️ Файл {NEWS_FILE} не найден")
+    """
+    Выбирает по top_n лучших статей из каждого источника.
+    Оценка — тематика (BM25 по профилю), длина, свежесть и вес источника (utils/ranker.py).
+    """
+    # Число кандидатов по источникам — запрос к индексу метаданных статей
+    totals = storage.source_stats()
+    if not totals:
+        log.warning("⚠️ Нет извлечённых статей за сегодня")
         return []
 
-    # Загружаем данные
-    with open(NEWS_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-        news = data.get("items", data)
+    selected = rank_articles(top_n)
+    metrics.dropped("source_top_n", sum(totals.values()) - len(selected))
+    for src, total in totals.items():
+        picked = sum(1 for n in selected if n["source"] == src)
+        log.info(f"📚 {src}: выбрано {picked} из {total} статей")
 
-    # Подсчёт длины текста каждой статьи
-    for n in news:
-        art_path = ARTICLES_DIR / f"{n['id']}.txt"
-        if art_path.exists():
-            try:
-                text = art_path.read_text(encoding="utf-8")
-                n["char_count"] = len(text)
-            except Exception as e:
-                log.warning(f"⚠️ Ошибка чтения {art_path}: {e}")
-                n["char_count"] = 0
-        else:
-            n["char_count"] = 0
-
-    # Группировка по источнику
-    grouped = defaultdict(list)
-    for n in news:
-        src = n.get("source", "unknown")
-        grouped[src].append(n)
-
-    # Для каждого источника берём top_n самых длинных
-    selected = []
-    for src, items in grouped.items():
-        items = [n for n in items if n["char_count"] > 0]
-        items.sort(key=lambda x: x["char_count"], reverse=True)
-        top_items = items[:top_n]
-        selected.extend(top_items)
-        log.info(f"📚 {src}: выбрано {len(top_items)} из {len(items)} статей")
-
-    # Сохраняем результат
+    # Сохраняем результат (база + JSON-экспорт)
+    storage.save_selected(selected)
     SELECTED_FILE.parent.mkdir(parents=True, exist_ok=True)
     with open(SELECTED_FILE, "w", encoding="utf-8") as f:
         json.dump(selected, f, ensure_ascii=False, indent=2)
 
-    log.info(f"✅ Всего отобрано {len(selected)} статей из {len(grouped)} источников")
+    log.info(f"✅ Всего отобрано {len(selected)} статей из {len(totals)} источников")
     return selected
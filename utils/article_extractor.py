@@ -1,56 +1,265 @@
-import requests
+import argparse
+import hashlib
+import re
 from bs4 import BeautifulSoup
 from pathlib import Path
-import json
+from core import metrics, storage
 from core.logger import log
+from utils import article_store
+from utils.helpers import fetch_page, find_main_image, make_soup
+from utils.http_cache import log_cache_stats
 
-NEWS_FILE = Path("data/news.json")
-ARTICLES_DIR = Path("data/articles")
+ARTICLES_DIR = Path("data/articles")  # архив текстов (utils.article_store)
+MIN_TEXT_LENGTH = 300
+EXTRACT_BATCH = 50  # текстов на одну дозапись в архив и одну транзакцию метаданных
 
+# === Выделение основного текста ===
+TEXT_BLOCKS = ["p", "pre", "blockquote", "li", "h2", "h3"]
+BOILERPLATE_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "iframe", "svg"}
+NEGATIVE_HINTS = re.compile(
+    r"comment|footer|sidebar|related|share|social|promo|newsletter|subscribe|advert|menu|breadcrumb|cookie",
+    re.I,
+)
+POSITIVE_HINTS = re.compile(r"article|body|content|entry|main|post|story|text", re.I)
+MAX_LINK_DENSITY = 0.5
 
+
+def _clean_lines(lines) -> list[str]:
+    """Строки длиннее 50 символов без cookie/privacy-баннеров."""
+    return [
+        line.strip()
+        for line in lines
+        if len(line.strip()) > 50
+        and not line.strip().lower().startswith(("cookie", "accept", "privacy"))
+    ]
+
+
+def _in_boilerplate(tag) -> bool:
+    return any(parent.name in BOILERPLATE_TAGS for parent in tag.parents)
+
+
+def _in_negative_block(tag, container) -> bool:
+    """Лежит ли тег внутри блока «поделиться»/«похожие» и т.п. внутри контейнера."""
+    for parent in tag.parents:
+        if parent is container:
+            return False
+        if _class_weight(parent) < 0:
+            return True
+    return False
+
+
+def _class_weight(tag) -> int:
+    hints = " ".join([" ".join(tag.get("class") or []), tag.get("id") or ""])
+    weight = 0
+    if NEGATIVE_HINTS.search(hints):
+        weight -= 25
+    if POSITIVE_HINTS.search(hints):
+        weight += 25
+    return weight
+
+
+def _link_density(tag) -> float:
+    text_len = len(tag.get_text(strip=True))
+    if not text_len:
+        return 1.0
+    link_len = sum(len(a.get_text(strip=True)) for a in tag.find_all("a"))
+    return link_len / text_len
+
+
+def _best_container(soup: BeautifulSoup):
+    """
+    Контейнер с основным текстом: абзацы начисляют очки родителю и деду
+    (по длине и запятым), итог штрафуется плотностью ссылок.
+    """
+    scores = {}
+    for p in soup.find_all(["p", "pre", "blockquote"]):
+        if _in_boilerplate(p):
+            continue
+        text = p.get_text(" ", strip=True)
+        if len(text) < 25:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        for node, share in ((p.parent, 1.0), (p.parent.parent if p.parent else None, 0.5)):
+            if node is None or node.name in (None, "[document]"):
+                continue
+            if id(node) not in scores:
+                scores[id(node)] = [node, _class_weight(node)]
+            scores[id(node)][1] += score * share
+
+    best, best_score = None, 0.0
+    for node, score in scores.values():
+        score *= 1 - _link_density(node)
+        if score > best_score:
+            best, best_score = node, score
+    return best
+
+
+def extract_text(soup: BeautifulSoup) -> str:
+    """
+    Основной текст статьи без навигации, блоков «похожие статьи» и подвала.
+    Если основной контейнер не найден или текста в нём мало —
+    очищенный текст всей страницы, как раньше.
+    """
+    container = _best_container(soup)
+    if container is not None:
+        blocks = []
+        for el in container.find_all(TEXT_BLOCKS):
+            # вложенные блоки (li с p внутри) берём один раз — по самому глубокому
+            if el.find(TEXT_BLOCKS) or _in_boilerplate(el) or _in_negative_block(el, container):
+                continue
+            if _link_density(el) > MAX_LINK_DENSITY:
+                continue
+            blocks.append(el.get_text(" ", strip=True).replace("\xa0", " "))
+        text = "\n".join(_clean_lines(blocks))
+        if len(text) >= MIN_TEXT_LENGTH:
+            return text
+
+    text = soup.get_text(separator="\n").replace("\xa0", " ").replace("\r", "")
+    return "\n".join(_clean_lines(text.splitlines()))
+
+
+def article_meta(text: str) -> dict:
+    """Метаданные текста, которые сохраняются вместе с ним при извлечении."""
+    return {
+        "char_count": len(text),
+        "word_count": len(text.split()),
+        "content_hash": hashlib.sha1(text.encode("utf-8")).hexdigest(),
+    }
+
+
+def read_article_text(news_id: str) -> str | None:
+    text = article_store.archive(ARTICLES_DIR).get(news_id)
+    if text is None:
+        # .txt, ещё не перенесённый в архив
+        path = ARTICLES_DIR / f"{news_id}{article_store.LEGACY_SUFFIX}"
+        text = path.read_text(encoding="utf-8") if path.exists() else None
+    return text
+
+
+def save_article_texts(texts: dict[str, tuple[str, str | None]]):
+    """
+    {id: (текст, источник)} — одна дозапись в архив и одна транзакция метаданных
+    (длина, хеш, положение в архиве) на весь пакет.
+    """
+    if not texts:
+        return
+    locations = article_store.archive(ARTICLES_DIR).put_many({i: t for i, (t, _) in texts.items()})
+    storage.save_article_metas([
+        {"id": news_id, "source": source, "location": locations[news_id], **article_meta(text)}
+        for news_id, (text, source) in texts.items()
+    ])
+    log.info(f"📝 Saved article texts: {len(texts)}")
+
+
+def save_article_text(news_id: str, text: str, source: str | None = None):
+    """Дописывает текст в архив и сразу обновляет индекс метаданных."""
+    save_article_texts({news_id: (text, source)})
+
+
+def reindex_articles():
+    """
+    Сверяет индекс метаданных с архивом статей (сначала переносит в него старые .txt).
+    Читаются только тексты, положение которых в архиве изменилось (новые и перезаписанные);
+    записи статей, которых нет в архиве, убираются.
+    """
+    store = article_store.archive(ARTICLES_DIR)
+    article_store.migrate(store)
+    index = storage.article_index()
+    archived = set(store.ids())
+    changed = []
+    for news_id in archived:
+        location = store.location(news_id)
+        row = index.get(news_id)
+        if row and row["location"] == location:
+            continue
+        changed.append({"id": news_id, "location": location, **article_meta(store.get(news_id))})
+    storage.save_article_metas(changed)
+    updated = len(changed)
+
+    # старые .txt уже перенесены — метаданные без текста в архиве устарели
+    removed = [i for i in index if i not in archived]
+    storage.delete_article_meta(removed)
+    log.info(f"🗂 Индекс статей: обновлено {updated}, удалено {len(removed)}, всего {len(archived)}")
+
+
+def parse_page(html: str, base_url: str):
+    """
+    Разбор уже загруженной страницы: (url главной картинки, очищенный текст).
+    Чистая функция без сети и базы — выполняется и в процессах utils.parse_pool.
+    """
+    soup = make_soup(html)
+    return find_main_image(soup, base_url), extract_text(soup)
+
+
+def process_page(url: str):
+    """
+    Единая обработка страницы статьи: одна загрузка и один разбор HTML.
+    Возвращает (url главной картинки, очищенный текст) или (None, None).
+    """
+    html, base_url = fetch_page(url)
+    if not html:
+        return None, None
+    return parse_page(html, base_url or url)
+
+
+@metrics.stage("extract")
 def extract_all_articles():
-    """Скачивает HTML-страницы из news.json и сохраняет очищенный текст в .txt файлы."""
-    ARTICLES_DIR.mkdir(parents=True, exist_ok=True)
+    """
+    Скачивает HTML-страницы сегодняшних новостей и сохраняет очищенный текст в архив статей.
+    Статьи, текст которых уже сохранён при сборе (process_page), пропускаются.
+    Страницы качаются в потоках, а разбираются в пуле процессов (utils.parse_pool).
+    """
+    from utils.parse_pool import fetch_and_parse
 
-    with open(NEWS_FILE, "r", encoding="utf-8") as f:
-        news_data = json.load(f)
-        if isinstance(news_data, dict) and "items" in news_data:
-            news_list = news_data["items"]
-        else:
-            news_list = news_data
+    store = article_store.archive(ARTICLES_DIR)
+    article_store.migrate(store)
 
-    for item in news_list:
+    pending = {}
+    for item in storage.load_items():
         url = item.get("url")
-        if not url:
+        if not url or storage.has_article(item["id"]):
             continue
 
-        art_path = ARTICLES_DIR / f"{item['id']}.txt"
-        if art_path.exists():
+        if item["id"] in store:
+            # текст сохранён до появления индекса — записываем только метаданные
+            storage.save_article_meta(
+                item["id"],
+                source=item.get("source"),
+                location=store.location(item["id"]),
+                **article_meta(store.get(item["id"])),
+            )
             continue
+        pending[item["id"]] = item
 
-        try:
-            r = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-            if r.status_code != 200:
-                log.warning(f"⚠️ {r.status_code} — {url}")
-                continue
+    batch = {}
+    for news_id, result in fetch_and_parse({i: item["url"] for i, item in pending.items()}):
+        item = pending[news_id]
+        if isinstance(result, Exception) or result[1] is None:
+            log.warning(f"[extract] Failed {item['url']}: {result if isinstance(result, Exception) else 'no page'}")
+            metrics.dropped("fetch_error")
+            continue
 
-            soup = BeautifulSoup(r.text, "html.parser")
-            text = soup.get_text(separator="\n").replace("\xa0", " ").replace("\r", "")
-            clean_lines = [
-                line.strip()
-                for line in text.splitlines()
-                if len(line.strip()) > 50
-                and not line.lower().startswith(("cookie", "accept", "privacy"))
-            ]
-            text = "\n".join(clean_lines)
-
-            if len(text) < 300:
-                log.warning(f"⚠️ Too short ({len(text)} chars): {url}")
-                continue
+        text = result[1]
+        if len(text) < MIN_TEXT_LENGTH:
+            log.warning(f"⚠️ Too short ({len(text)} chars): {item['url']}")
+            metrics.dropped("short_text")
+            continue
 
-            art_path.write_text(text, encoding="utf-8")
-            log.info(f"📝 Saved article text: {art_path.name}")
+        batch[news_id] = (text, item.get("source"))
+        if len(batch) >= EXTRACT_BATCH:
+            save_article_texts(batch)
+            batch = {}
 
-        except Exception as e:
-            log.warning(f"[extract] Failed {url}: {e}")
-            continue
+    save_article_texts(batch)
+    log_cache_stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract article texts")
+    parser.add_argument("--reindex", action="store_true", help="rebuild the article metadata index from the data/articles archive")
+    args = parser.parse_args()
+
+    if args.reindex:
+        reindex_articles()
+    else:
+        extract_all_articles()
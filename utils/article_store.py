@@ -0,0 +1,238 @@
+# utils/article_store.py
+"""
+Архив текстов статей вместо файла .txt на каждую статью.
+Тексты сжимаются zlib по одному и дописываются в сегменты segment-NNNNN.z
+(только дозапись, новый сегмент — после ARCHIVE_SEGMENT_BYTES), а компактный
+индекс articles.idx хранит строки «id, сегмент, смещение, длина».
+Чтение идёт через mmap сегментов: проверка наличия — по индексу в памяти,
+без обращения к файлам.
+
+Индекс — источник истины: запись сначала попадает в сегмент (fsync),
+потом строкой в индекс, поэтому оборванная запись оставляет в конце сегмента
+только мусор, на который никто не ссылается. Повторная запись того же id
+добавляет новую строку, действует последняя.
+
+    python -m utils.article_store --migrate   # перенести data/articles/*.txt в архив
+    python -m utils.article_store --stats
+"""
+import argparse
+import mmap
+import os
+import threading
+import zlib
+from pathlib import Path
+
+from core.logger import log
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка между процессами недоступна
+    fcntl = None
+
+ARCHIVE_SEGMENT_BYTES = int(os.getenv("ARCHIVE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+ARCHIVE_LEVEL = 6  # уровень сжатия zlib
+INDEX_NAME = "articles.idx"
+SEGMENT_PATTERN = "segment-{:05d}.z"
+LEGACY_SUFFIX = ".txt"
+
+
+class ArticleArchive:
+    """Архив в каталоге root; потокобезопасен, дозапись между процессами — под flock."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.index_path = self.root / INDEX_NAME
+        self._lock = threading.RLock()
+        self._index = {}  # id -> (сегмент, смещение, длина)
+        self._index_pos = 0  # до какого байта прочитан файл индекса
+        self._maps = {}  # сегмент -> mmap
+        self._refresh()
+
+    # === Индекс ===
+
+    def _refresh(self):
+        """Дочитывает строки индекса, дописанные после прошлого чтения (в т.ч. другим процессом)."""
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_pos)
+            data = f.read()
+        # последняя строка без \n — запись ещё не закончена
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.decode("ascii").splitlines():
+            news_id, segment, offset, length = line.split("\t")
+            self._index[news_id] = (int(segment), int(offset), int(length))
+        self._index_pos += len(complete)
+
+    def __contains__(self, news_id: str) -> bool:
+        with self._lock:
+            if news_id not in self._index:
+                self._refresh()
+            return news_id in self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._index)
+
+    def location(self, news_id: str) -> str | None:
+        """«сегмент:смещение» текущей версии текста: меняется при каждой перезаписи id."""
+        with self._lock:
+            if news_id not in self._index:
+                self._refresh()
+            entry = self._index.get(news_id)
+        return f"{entry[0]}:{entry[1]}" if entry else None
+
+    def ids(self) -> list[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._index)
+
+    # === Чтение ===
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.root / SEGMENT_PATTERN.format(segment)
+
+    def _map(self, segment: int, end: int) -> mmap.mmap:
+        mm = self._maps.get(segment)
+        if mm is None or len(mm) < end:
+            # сегмент дописан после отображения — отображаем заново
+            if mm is not None:
+                mm.close()
+            with open(self._segment_path(segment), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mm
+        return mm
+
+    def get(self, news_id: str) -> str | None:
+        with self._lock:
+            if news_id not in self._index:
+                self._refresh()
+            entry = self._index.get(news_id)
+            if entry is None:
+                return None
+            segment, offset, length = entry
+            data = self._map(segment, offset + length)[offset:offset + length]
+        return zlib.decompress(data).decode("utf-8")
+
+    def items(self):
+        """(id, текст) всех статей архива в порядке id."""
+        for news_id in sorted(self.ids()):
+            yield news_id, self.get(news_id)
+
+    # === Запись ===
+
+    def _tail_segment(self) -> int:
+        segments = sorted(self.root.glob(SEGMENT_PATTERN.replace("{:05d}", "*")))
+        if not segments:
+            return 0
+        last = int(segments[-1].name.split("-")[1].split(".")[0])
+        if segments[-1].stat().st_size >= ARCHIVE_SEGMENT_BYTES:
+            return last + 1
+        return last
+
+    def put_many(self, texts: dict[str, str]) -> dict[str, str]:
+        """
+        Дописывает тексты одним заходом: один fsync сегмента и один — индекса.
+        Возвращает id -> location записанных версий.
+        """
+        if not texts:
+            return {}
+        self.root.mkdir(parents=True, exist_ok=True)
+        blobs = {i: zlib.compress(t.encode("utf-8"), ARCHIVE_LEVEL) for i, t in texts.items()}
+        with self._lock, open(self.index_path, "ab") as index:
+            if fcntl:
+                fcntl.flock(index, fcntl.LOCK_EX)
+            try:
+                segment = self._tail_segment()
+                lines = []
+                with open(self._segment_path(segment), "ab") as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    for news_id, blob in blobs.items():
+                        f.write(blob)
+                        lines.append(f"{news_id}\t{segment}\t{offset}\t{len(blob)}\n")
+                        offset += len(blob)
+                    f.flush()
+                    os.fsync(f.fileno())
+                index.write("".join(lines).encode("ascii"))
+                index.flush()
+                os.fsync(index.fileno())
+            finally:
+                if fcntl:
+                    fcntl.flock(index, fcntl.LOCK_UN)
+            self._refresh()
+            return {news_id: self.location(news_id) for news_id in blobs}
+
+    def put(self, news_id: str, text: str) -> str:
+        return self.put_many({news_id: text})[news_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            segments = list(self.root.glob(SEGMENT_PATTERN.replace("{:05d}", "*")))
+            return {
+                "articles": len(self._index),
+                "segments": len(segments),
+                "bytes": sum(p.stat().st_size for p in segments),
+                "index_bytes": self.index_path.stat().st_size if self.index_path.exists() else 0,
+            }
+
+
+# === Старый формат: файл .txt на статью ===
+
+def legacy_files(root: Path) -> list[Path]:
+    return sorted(Path(root).glob(f"*{LEGACY_SUFFIX}"))
+
+
+def read_texts(root: Path):
+    """(id, текст) из архива и ещё не перенесённых .txt — только чтение, без миграции."""
+    root = Path(root)
+    texts = dict(ArticleArchive(root).items()) if (root / INDEX_NAME).exists() else {}
+    for path in legacy_files(root):
+        texts.setdefault(path.stem, path.read_text(encoding="utf-8"))
+    return sorted(texts.items())
+
+
+def migrate(store: ArticleArchive, batch: int = 500) -> int:
+    """Переносит *.txt из каталога архива в сегменты; файл удаляется после fsync индекса."""
+    files = legacy_files(store.root)
+    for i in range(0, len(files), batch):
+        chunk = files[i:i + batch]
+        store.put_many({p.stem: p.read_text(encoding="utf-8") for p in chunk if p.stem not in store})
+        for path in chunk:
+            path.unlink()
+    if files:
+        log.info(f"📦 Перенесено в архив статей: {len(files)} файлов из {store.root}")
+    return len(files)
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def archive(root: Path) -> ArticleArchive:
+    """Общий экземпляр архива каталога root (mmap и индекс открываются один раз)."""
+    key = Path(root).resolve()
+    with _archives_lock:
+        if key not in _archives:
+            _archives[key] = ArticleArchive(root)
+        return _archives[key]
+
+
+if __name__ == "__main__":
+    from utils.article_extractor import ARTICLES_DIR
+
+    parser = argparse.ArgumentParser(description="Packed article archive")
+    parser.add_argument("--migrate", action="store_true", help="move data/articles/*.txt into the archive")
+    parser.add_argument("--stats", action="store_true", help="print archive size")
+    args = parser.parse_args()
+
+    store = archive(ARTICLES_DIR)
+    if args.migrate:
+        migrate(store)
+    s = store.stats()
+    log.info(
+        f"📦 Архив {ARTICLES_DIR}: {s['articles']} статей, {s['segments']} сегм., "
+        f"{s['bytes'] / 1024:.0f} КБ + индекс {s['index_bytes'] / 1024:.0f} КБ, "
+        f"ещё не перенесено .txt: {len(legacy_files(ARTICLES_DIR))}"
+    )
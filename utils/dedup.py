@@ -0,0 +1,114 @@
+# utils/dedup.py
+import hashlib
+import os
+import random
+import re
+from collections import defaultdict
+
+from core import metrics, storage
+from core.logger import log
+from utils.article_extractor import read_article_text
+
+# === Параметры MinHash / LSH ===
+NUM_PERM = 64  # длина сигнатуры
+BANDS = 16  # NUM_PERM = BANDS * ROWS; порог срабатывания LSH ≈ (1 / BANDS) ** (1 / ROWS)
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3  # слов в шингле
+MAX_WORDS = 600  # начало статьи достаточно для сравнения
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.5"))  # оценка сходства Жаккара
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20251101)  # фиксированные перестановки — сигнатуры воспроизводимы
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def shingles(text: str) -> set[str]:
+    words = re.findall(r"\w+", text.lower())[:MAX_WORDS]
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set: set[str]) -> tuple[int, ...]:
+    """MinHash-сигнатура множества шинглов."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+        for s in shingle_set
+    ]
+    if not hashes:
+        return (_PRIME,) * NUM_PERM
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def similarity(sig_a, sig_b) -> float:
+    """Оценка сходства Жаккара по двум сигнатурам."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+
+def find_clusters(signatures: dict[str, tuple[int, ...]], sources: dict[str, str] | None = None,
+                  threshold: float = DEDUP_THRESHOLD):
+    """
+    Группирует почти-дубликаты. Кандидаты — только пары, совпавшие хотя бы в одной
+    полосе LSH, поэтому стоимость близка к линейной по числу статей.
+    Если передан sources (id -> источник), статьи одного источника не сравниваются:
+    у них общий шаблон страницы, а не общая история.
+    Возвращает списки id для кластеров из двух и более статей.
+    """
+    parent = {i: i for i in signatures}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    buckets = defaultdict(list)
+    for news_id, sig in signatures.items():
+        for band in range(BANDS):
+            buckets[(band, sig[band * ROWS:(band + 1) * ROWS])].append(news_id)
+
+    checked = set()
+    for ids in buckets.values():
+        for i, a in enumerate(ids):
+            for b in ids[i + 1:]:
+                pair = (a, b) if a < b else (b, a)
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                if sources and sources.get(a) == sources.get(b):
+                    continue
+                if similarity(signatures[a], signatures[b]) >= threshold:
+                    parent[find(a)] = find(b)
+
+    groups = defaultdict(list)
+    for news_id in signatures:
+        groups[find(news_id)].append(news_id)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+@metrics.stage("dedup")
+def cluster_duplicates():
+    """
+    Находит одну и ту же историю у разных источников среди сегодняшних статей.
+    В каждом кластере остаётся представитель с самым длинным текстом,
+    остальные исключаются из отбора (analyze_articles).
+    """
+    items = {n["id"]: n for n in storage.load_extracted_items()}
+    signatures = {}
+    for news_id, item in items.items():
+        text = read_article_text(news_id) or ""
+        signatures[news_id] = minhash(shingles(f"{item['title']}\n{text}"))
+
+    clusters = []
+    sources = {news_id: item["source"] for news_id, item in items.items()}
+    for members in find_clusters(signatures, sources):
+        rep = max(members, key=lambda i: items[i]["char_count"])
+        clusters.append((rep, members))
+        titles = "; ".join(f"{items[i]['source']}: {items[i]['title'][:50]}" for i in members)
+        log.info(f"🧬 Дубликаты ({len(members)}): {titles}")
+
+    storage.save_clusters(clusters)
+    dropped = sum(len(m) - 1 for _, m in clusters)
+    metrics.dropped("duplicate", dropped)
+    log.info(f"✅ Найдено {len(clusters)} кластеров дубликатов, исключено {dropped} статей из {len(items)}")
+    return clusters
@@ -1,15 +1,21 @@
 # utils/helpers.py
+import codecs
 import hashlib
 import os
+from html.parser import HTMLParser
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound
 
-USER_AGENT = "Mozilla/5.0 (compatible; itnews-collector/1.0)"
-REQUEST_TIMEOUT = 15  # seconds
+from core.logger import log
+from utils import http_cache, http_client
+from utils.http_cache import cached_get, get_cached
 IMG_EXT_WHITELIST = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+HEAD_SCAN_LIMIT = 256 * 1024  # сколько байт читать в поисках </head>
+# бэкенд разбора HTML: "html.parser" (по умолчанию) или "lxml" (быстрее, нужен пакет lxml);
+# сравнить их на своих страницах: python -m benchmarks.parser_bench
+HTML_PARSER = os.getenv("HTML_PARSER", "html.parser")
 
 
 def generate_id(url: str) -> str:
@@ -17,33 +23,113 @@ def generate_id(url: str) -> str:
     return hashlib.sha1(url.encode("utf-8")).hexdigest()[:10]
 
 
-def _fetch_page(url: str):
+def make_soup(html: str, parser: str | None = None) -> BeautifulSoup:
+    """BeautifulSoup с настроенным бэкендом; если он не установлен — html.parser."""
+    global HTML_PARSER
+    parser = parser or HTML_PARSER
     try:
-        r = requests.get(
-            url,
-            headers={"User-Agent": USER_AGENT},
-            timeout=REQUEST_TIMEOUT,
-            allow_redirects=True,
-        )
+        return BeautifulSoup(html, parser)
+    except FeatureNotFound:
+        log.warning(f"⚠️ HTML-парсер {parser} не установлен, используется html.parser")
+        HTML_PARSER = "html.parser"
+        return BeautifulSoup(html, "html.parser")
+
+
+def fetch_page(url: str):
+    """HTML страницы и итоговый url (после редиректов) через HTTP-кеш; (None, None) при ошибке."""
+    try:
+        r = cached_get(url)
         r.raise_for_status()
         return r.text, r.url
     except Exception:
         return None, None
 
 
+class _HeadImageParser(HTMLParser):
+    """Потоковый разбор <head>: ищет og:image и rel=image_src, останавливается на </head>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.og_image = None
+        self.image_src = None
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            self.done = True
+            return
+        a = dict(attrs)
+        if tag == "meta" and a.get("property") == "og:image" and self.og_image is None:
+            self.og_image = a.get("content") or ""
+        elif tag == "link" and "image_src" in (a.get("rel") or "").split() and self.image_src is None:
+            self.image_src = a.get("href") or ""
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.done = True
+
+
+def _stream_head_image(page_url: str):
+    """
+    Читает страницу потоком только до </head>.
+    Возвращает (og:image, None, base) при раннем выходе
+    или (None, полный HTML, base), если в <head> картинки нет;
+    тогда страница сохраняется в HTTP-кеш, и извлечение текста не качает её снова.
+    """
+    with http_client.stream(page_url) as r:
+        r.raise_for_status()
+        decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+        parser = _HeadImageParser()
+        chunks = []
+        read = 0
+        stream = r.iter_content(8192)
+        for chunk in stream:
+            chunks.append(chunk)
+            read += len(chunk)
+            if not parser.done and read <= HEAD_SCAN_LIMIT:
+                parser.feed(decoder.decode(chunk))
+            if parser.done or read > HEAD_SCAN_LIMIT:
+                # первый og:image в документе — тот же, что нашёл бы полный разбор
+                if parser.og_image:
+                    return parser.og_image, None, r.url
+                break
+        # картинки в <head> нет — дочитываем тело для эвристики (не больше HTTP_MAX_BYTES)
+        for chunk in stream:
+            chunks.append(chunk)
+            read += len(chunk)
+            if read > http_client.HTTP_MAX_BYTES:
+                raise http_client.ResponseTooLarge(
+                    f"{r.url}: больше {http_client.HTTP_MAX_BYTES} байт", response=r
+                )
+        r._content = b"".join(chunks)
+        http_cache.store(page_url, r)
+        return None, r.text, r.url
+
+
 def fetch_main_image(page_url: str) -> str | None:
     """
     Возвращает URL главной картинки со страницы:
     1) og:image / rel=image_src
     2) эвристика по <img>
+    Страница читается потоком до </head>; тело дочитывается и разбирается
+    целиком, только если в <head> нет og:image.
     """
-    html, base_url = _fetch_page(page_url)
-    if not html:
-        return None
-
-    soup = BeautifulSoup(html, "html.parser")
-    base = base_url or page_url
-
+    cached = get_cached(page_url)
+    if cached is not None and cached.ok:
+        html, base_url = cached.text, cached.url
+    else:
+        try:
+            og_image, html, base_url = _stream_head_image(page_url)
+        except Exception:
+            return None
+        if og_image:
+            return urljoin(base_url, og_image)
+
+    return find_main_image(make_soup(html), base_url or page_url)
+
+
+def find_main_image(soup: BeautifulSoup, base: str) -> str | None:
+    """Ищет главную картинку в уже разобранной странице (см. fetch_main_image)."""
     # 1) OpenGraph
     og = soup.find("meta", property="og:image")
     if og and og.get("content"):
@@ -106,28 +192,22 @@ def download_image(img_url: str, img_root: Path, news_id: str) -> str | None:
     """
     Качает изображение в img_root как preview_<id>.<ext>.
     Возвращает относительный путь (str) или None.
+    HTTP-кеш не используется: после нормализации картинка и так хранится
+    в images/shared, второй копии исходных байтов на диске не нужно.
     """
     if not img_url:
         return None
 
     img_root.mkdir(parents=True, exist_ok=True)
     try:
-        with requests.get(
-            img_url,
-            headers={"User-Agent": USER_AGENT, "Referer": img_url},
-            timeout=REQUEST_TIMEOUT,
-            stream=True,
-        ) as r:
-            r.raise_for_status()
-            ext = _ext_from_url_or_ct(img_url, r.headers.get("Content-Type"))
-            out_path = img_root / f"preview_{news_id}{ext}"
-            tmp = out_path.with_suffix(out_path.suffix + ".part")
-            with tmp.open("wb") as f:
-                for chunk in r.iter_content(8192):
-                    if chunk:
-                        f.write(chunk)
-            tmp.rename(out_path)
-            # вернем путь в виде "data/images/preview_<id>.ext"
-            return str(out_path.as_posix())
+        r = http_client.get(img_url, headers={"Referer": img_url})
+        r.raise_for_status()
+        ext = _ext_from_url_or_ct(img_url, r.headers.get("Content-Type"))
+        out_path = img_root / f"preview_{news_id}{ext}"
+        tmp = out_path.with_suffix(out_path.suffix + ".part")
+        tmp.write_bytes(r.content)
+        tmp.rename(out_path)
+        # вернем путь в виде "data/images/preview_<id>.ext"
+        return str(out_path.as_posix())
     except Exception:
         return None
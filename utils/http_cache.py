@@ -0,0 +1,174 @@
+# utils/http_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from core import metrics
+from core.logger import log
+from utils import http_client
+
+# === Настройки кеша ===
+DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
+HTTP_CACHE_DIR = DATA_DIR / "http_cache"
+HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", str(6 * 3600)))  # секунды, 0 — кеш выключен
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# вытеснение освобождает место с запасом — до этой доли бюджета, чтобы
+# следующие записи не сканировали каталог кеша каждый раз заново
+HTTP_CACHE_LOW_WATER = 0.9
+
+# заголовки, которые не имеют смысла для уже раскодированного тела
+_SKIP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+_lock = threading.Lock()
+_total_bytes = None
+stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def _key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _paths(key: str):
+    base = HTTP_CACHE_DIR / key[:2] / key
+    return base.with_suffix(".json"), base.with_suffix(".body")
+
+
+def _count(name: str, n: int = 1):
+    with _lock:
+        stats[name] += n
+    metrics.inc("http_cache_total", n, event=name)
+
+
+def _to_response(meta: dict, body: bytes) -> requests.Response:
+    """Собирает requests.Response из записи кеша — вызывающий код не меняется."""
+    r = requests.Response()
+    r.status_code = meta["status"]
+    r.headers = CaseInsensitiveDict(meta["headers"])
+    r.url = meta["final_url"]
+    r.encoding = get_encoding_from_headers(r.headers)
+    r._content = body
+    return r
+
+
+def _read(url: str, ttl: int):
+    meta_path, body_path = _paths(_key(url))
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta["url"] != url or time.time() - meta["stored_at"] > ttl:
+            return None
+        body = body_path.read_bytes()
+    except (OSError, ValueError, KeyError):
+        return None
+
+    # время доступа — основа LRU-вытеснения
+    now = time.time()
+    os.utime(body_path, (now, now))
+    return _to_response(meta, body)
+
+
+def _total_size() -> int:
+    global _total_bytes
+    if _total_bytes is None:
+        _total_bytes = sum(p.stat().st_size for p in HTTP_CACHE_DIR.glob("*/*.body"))
+    return _total_bytes
+
+
+def _evict():
+    """
+    При превышении бюджета удаляет давно не использованные записи,
+    пока кеш не уменьшится до HTTP_CACHE_LOW_WATER бюджета.
+    """
+    global _total_bytes
+    if _total_size() <= HTTP_CACHE_MAX_BYTES:
+        return
+
+    target = HTTP_CACHE_MAX_BYTES * HTTP_CACHE_LOW_WATER
+    bodies = sorted(HTTP_CACHE_DIR.glob("*/*.body"), key=lambda p: p.stat().st_mtime)
+    for body_path in bodies:
+        if _total_bytes <= target:
+            break
+        try:
+            size = body_path.stat().st_size
+            body_path.unlink()
+            body_path.with_suffix(".json").unlink(missing_ok=True)
+        except OSError:
+            continue
+        _total_bytes -= size
+        stats["evictions"] += 1
+        metrics.inc("http_cache_total", event="evictions")
+
+
+def _store(url: str, r: requests.Response):
+    meta_path, body_path = _paths(_key(url))
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "url": url,
+        "final_url": r.url,
+        "status": r.status_code,
+        "headers": {k: v for k, v in r.headers.items() if k.lower() not in _SKIP_HEADERS},
+        "stored_at": time.time(),
+        "size": len(r.content),
+    }
+
+    with _lock:
+        total = _total_size()
+        old_size = body_path.stat().st_size if body_path.exists() else 0
+        tmp = body_path.with_suffix(".part")
+        tmp.write_bytes(r.content)
+        os.replace(tmp, body_path)
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+        global _total_bytes
+        _total_bytes = total + len(r.content) - old_size
+        stats["stores"] += 1
+        _evict()
+
+
+def get_cached(url: str, ttl: int | None = None) -> requests.Response | None:
+    """Свежая запись кеша для url или None (без обращения к сети)."""
+    ttl = HTTP_CACHE_TTL if ttl is None else ttl
+    if ttl <= 0:
+        return None
+    cached = _read(url, ttl)
+    _count("hits" if cached is not None else "misses")
+    return cached
+
+
+def cached_get(url: str, headers=None, timeout=http_client.REQUEST_TIMEOUT, ttl: int | None = None) -> requests.Response:
+    """
+    GET через дисковый кеш: свежая запись (моложе ttl) отдаётся без сети,
+    иначе запрос уходит в сеть, а успешный ответ (200) сохраняется.
+    """
+    ttl = HTTP_CACHE_TTL if ttl is None else ttl
+    cached = get_cached(url, ttl)
+    if cached is not None:
+        return cached
+
+    r = http_client.get(url, headers=headers, timeout=timeout)
+    if ttl > 0:
+        store(url, r)
+    return r
+
+
+def store(url: str, r: requests.Response):
+    """Сохраняет успешный (200) ответ с уже прочитанным телом, полученный мимо cached_get."""
+    if HTTP_CACHE_TTL <= 0 or r.status_code != 200:
+        return
+    try:
+        _store(url, r)
+    except OSError as e:
+        log.warning(f"⚠️ Не удалось записать в HTTP-кеш {url}: {e}")
+
+
+def log_cache_stats():
+    log.info(
+        f"💾 HTTP-кеш: {stats['hits']} попаданий, {stats['misses']} промахов, "
+        f"{stats['stores']} записано, {stats['evictions']} вытеснено"
+    )
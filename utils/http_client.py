@@ -0,0 +1,117 @@
+# utils/http_client.py
+"""
+Общий HTTP-клиент для всех исходящих запросов (ленты, страницы, картинки).
+Одна requests.Session: keep-alive соединения переиспользуются в пуле каждого хоста,
+число одновременных запросов к одному хосту ограничено, User-Agent и таймаут
+одинаковые, а размер ответа ограничен HTTP_MAX_BYTES.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core import metrics
+from core.logger import log
+
+USER_AGENT = "Mozilla/5.0 (compatible; itnews-collector/1.0)"
+REQUEST_TIMEOUT = 15  # seconds
+
+# === Настройки клиента ===
+HTTP_PER_HOST = int(os.getenv("HTTP_PER_HOST", "4"))  # одновременных запросов и соединений на хост
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "64"))  # хостов с открытыми соединениями
+HTTP_MAX_BYTES = int(os.getenv("HTTP_MAX_BYTES", str(20 * 1024 * 1024)))  # предел тела ответа
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+_lock = threading.Lock()
+_hosts = {}
+stats = {"requests": 0, "too_large": 0}
+
+
+class ResponseTooLarge(requests.RequestException):
+    """Тело ответа больше HTTP_MAX_BYTES — дочитывать не стали."""
+
+
+def session() -> requests.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_PER_HOST)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers["User-Agent"] = USER_AGENT
+            _session = s
+        return _session
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc.lower()
+    with _lock:
+        if host not in _hosts:
+            _hosts[host] = threading.BoundedSemaphore(HTTP_PER_HOST)
+        return _hosts[host]
+
+
+def _count(name: str):
+    with _lock:
+        stats[name] += 1
+
+
+def _check_length(r: requests.Response, max_bytes: int):
+    length = r.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        _count("too_large")
+        raise ResponseTooLarge(f"{r.url}: {length} байт > {max_bytes}", response=r)
+
+
+@contextmanager
+def stream(url: str, headers=None, timeout=REQUEST_TIMEOUT, max_bytes: int = HTTP_MAX_BYTES):
+    """
+    Потоковый GET: слот хоста занят, пока открыт ответ.
+    Ответы с Content-Length больше max_bytes отклоняются до чтения тела.
+    """
+    host = urlparse(url).netloc.lower()
+    with _host_slot(url):
+        start = time.perf_counter()
+        r = session().get(url, headers=headers, timeout=timeout, allow_redirects=True, stream=True)
+        # задержка до заголовков ответа — по ней видно медленные хосты
+        metrics.observe("http_request_seconds", time.perf_counter() - start, host=host)
+        metrics.inc("http_requests_total", host=host, status=r.status_code)
+        _count("requests")
+        try:
+            _check_length(r, max_bytes)
+            yield r
+        finally:
+            r.close()
+
+
+def get(url: str, headers=None, timeout=REQUEST_TIMEOUT, max_bytes: int = HTTP_MAX_BYTES) -> requests.Response:
+    """GET с телом, прочитанным целиком (не больше max_bytes), — как requests.get."""
+    with stream(url, headers=headers, timeout=timeout, max_bytes=max_bytes) as r:
+        body = bytearray()
+        for chunk in r.iter_content(CHUNK_SIZE):
+            body += chunk
+            if len(body) > max_bytes:
+                _count("too_large")
+                raise ResponseTooLarge(f"{r.url}: больше {max_bytes} байт", response=r)
+        r._content = bytes(body)
+    metrics.inc("http_response_bytes_total", len(body), host=urlparse(url).netloc.lower())
+    return r
+
+
+def log_client_stats():
+    """Сколько запросов ушло в сеть и сколько TCP/TLS-соединений для них открыто."""
+    if _session is None:
+        return
+    pools = _session.get_adapter("https://").poolmanager.pools
+    with pools.lock:
+        connections = sum(p.num_connections for p in pools._container.values())
+    log.info(
+        f"🌐 HTTP: {stats['requests']} запросов, {connections} новых соединений"
+        + (f", {stats['too_large']} слишком больших ответов" if stats["too_large"] else "")
+    )
@@ -0,0 +1,193 @@
+# utils/images.py
+"""
+Нормализация картинок после загрузки: уменьшение, перекодирование в JPEG
+и перцептивный хэш (dHash). Одинаковые и почти одинаковые картинки хранятся
+одним файлом data/images/shared/<hash>.jpg, новости ссылаются на него.
+Декодирование и сжатие выполняются в пуле процессов, а не в потоках загрузки.
+"""
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from core import metrics, storage
+from core.logger import log
+
+# === Параметры нормализации ===
+DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
+SHARED_DIR = DATA_DIR / "images" / "shared"
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1280"))  # длинная сторона, px
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))  # качество JPEG
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "0")) or os.cpu_count() or 1
+# максимальное число различающихся бит 64-битного dHash, при котором картинки считаются одной
+PHASH_DISTANCE = int(os.getenv("PHASH_DISTANCE", "6"))
+HASH_SIZE = 8
+
+
+def dhash(img, size: int = HASH_SIZE) -> int:
+    """Разностный хэш: знак перепада яркости между соседними пикселями уменьшенной копии."""
+    from PIL import Image
+
+    small = img.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS)
+    px = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = px[row * (size + 1) + col]
+            right = px[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _to_rgb(img):
+    """Первый кадр в RGB; прозрачность накладывается на белый фон."""
+    from PIL import Image
+
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def normalize_file(path: str) -> dict:
+    """
+    Выполняется в процессе пула: уменьшает картинку до IMAGE_MAX_SIDE,
+    сохраняет рядом как <имя>.norm.jpg и считает dHash.
+    Если исходный JPEG уже подходит по размеру и меньше результата, берутся исходные байты.
+    """
+    from PIL import Image, ImageOps
+
+    src = Path(path)
+    out = src.with_name(src.stem + ".norm.jpg")
+    try:
+        with Image.open(src) as img:
+            fmt = img.format
+            fits = max(img.size) <= IMAGE_MAX_SIDE
+            # для JPEG декодер сразу масштабирует в 2/4/8 раз — заметно дешевле полного декода
+            img.draft("RGB", (IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+            img = ImageOps.exif_transpose(img)
+            img = _to_rgb(img)
+            img.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.Resampling.LANCZOS)
+            img.save(out, "JPEG", quality=IMAGE_QUALITY, optimize=True, progressive=True)
+            phash = dhash(img)
+            width, height = img.size
+
+        bytes_in = src.stat().st_size
+        if fmt == "JPEG" and fits and bytes_in <= out.stat().st_size:
+            shutil.copyfile(src, out)
+        return {
+            "src": path, "out": str(out), "phash": f"{phash:016x}",
+            "width": width, "height": height,
+            "bytes_in": bytes_in, "bytes_out": out.stat().st_size,
+        }
+    except Exception as e:
+        out.unlink(missing_ok=True)
+        return {"src": path, "error": str(e)}
+
+
+def _bands(phash: int, count: int = PHASH_DISTANCE + 1):
+    """
+    Делит 64-битный хэш на count полос. Если хэши различаются не больше чем
+    в PHASH_DISTANCE битах, хотя бы одна из PHASH_DISTANCE + 1 полос совпадает целиком.
+    """
+    bits = HASH_SIZE * HASH_SIZE
+    start = 0
+    for i in range(count):
+        width = bits // count + (i < bits % count)
+        yield i, (phash >> start) & ((1 << width) - 1)
+        start += width
+
+
+class HashIndex:
+    """Поиск похожих хэшей по точному совпадению полос вместо сравнения со всеми сохранёнными."""
+
+    def __init__(self, known: dict[int, str]):
+        self.paths = {}
+        self.buckets = {}  # (номер полосы, значение) -> хэши
+        for phash, path in known.items():
+            self.add(phash, path)
+
+    def add(self, phash: int, path: str):
+        self.paths[phash] = path
+        for band in _bands(phash):
+            self.buckets.setdefault(band, []).append(phash)
+
+    def find(self, phash: int) -> str | None:
+        seen = set()
+        for band in _bands(phash):
+            for other in self.buckets.get(band, ()):
+                if other in seen:
+                    continue
+                seen.add(other)
+                path = self.paths[other]
+                if hamming(phash, other) <= PHASH_DISTANCE and Path(path).exists():
+                    return path
+        return None
+
+
+@metrics.stage("images")
+def normalize_images(items: list[dict]) -> list[dict]:
+    """
+    Нормализует image_path собранных новостей и склеивает почти одинаковые картинки.
+    Исходные preview_* удаляются, image_path указывает на общий файл в SHARED_DIR.
+    Картинки, которые не удалось декодировать, остаются как есть.
+    """
+    paths = sorted({
+        n["image_path"] for n in items
+        if n.get("image_path") and Path(n["image_path"]).parent != SHARED_DIR
+    })
+    if not paths:
+        return items
+
+    SHARED_DIR.mkdir(parents=True, exist_ok=True)
+    if len(paths) == 1:
+        results = [normalize_file(paths[0])]
+    else:
+        from utils.parse_pool import process_context
+
+        workers = min(IMAGE_WORKERS, len(paths))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=process_context()) as pool:
+            results = list(pool.map(normalize_file, paths, chunksize=4))
+
+    known = HashIndex({int(h, 16): p for h, p in storage.image_hashes().items()})
+    replaced = {}
+    bytes_in = bytes_out = shared = 0
+    for res in results:
+        if "error" in res:
+            log.warning(f"⚠️ Не удалось нормализовать {res['src']}: {res['error']}")
+            continue
+
+        bytes_in += res["bytes_in"]
+        phash = int(res["phash"], 16)
+        target = known.find(phash)
+        if target:
+            Path(res["out"]).unlink(missing_ok=True)
+            shared += 1
+        else:
+            target = (SHARED_DIR / f"{res['phash']}.jpg").as_posix()
+            os.replace(res["out"], target)
+            storage.save_image(res["phash"], target, res["width"], res["height"], res["bytes_out"])
+            known.add(phash, target)
+            bytes_out += res["bytes_out"]
+
+        Path(res["src"]).unlink(missing_ok=True)
+        replaced[res["src"]] = target
+
+    metrics.inc("image_bytes_total", bytes_in, stage="downloaded")
+    metrics.inc("image_bytes_total", bytes_out, stage="stored")
+    metrics.inc("images_shared_total", shared)
+    for item in items:
+        if item.get("image_path") in replaced:
+            item["image_path"] = replaced[item["image_path"]]
+
+    log.info(
+        f"🖼 Нормализовано {len(replaced)} картинок: {bytes_in / 1024:.0f} → {bytes_out / 1024:.0f} КБ, "
+        f"{shared} совпали с уже сохранёнными"
+    )
+    return items
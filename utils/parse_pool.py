@@ -0,0 +1,107 @@
+# utils/parse_pool.py
+"""
+Разбор HTML в пуле процессов. BeautifulSoup — чистый Python и держит GIL,
+поэтому потоки загрузки только качают байты, а разбор и извлечение текста
+(article_extractor.parse_page) идут в PARSE_WORKERS процессах.
+Между сторонами — противодавление: страница занимает слот с начала загрузки
+до конца разбора, и при полном пуле новые загрузки ждут, а не копят HTML в памяти.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import asynccontextmanager
+
+from core import metrics
+from utils.article_extractor import parse_page
+from utils.helpers import fetch_page
+
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0")) or os.cpu_count() or 1
+PARSE_BACKLOG = int(os.getenv("PARSE_BACKLOG", "32"))  # страниц одновременно: качаются, ждут и разбираются
+
+
+def process_context():
+    """
+    Способ запуска процессов пулов. Пулы создаются, когда потоки уже работают
+    (загрузка, поток постинга демона), а fork многопоточного процесса может унести
+    в дочерний чужую захваченную блокировку — поэтому forkserver (или spawn).
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class ParsePool:
+    """
+    Пул процессов разбора для асинхронного сборщика (with ParsePool() as pool: ...).
+    Процессы запускаются при первой странице: без новых записей пул не создаётся.
+    """
+
+    def __init__(self, workers: int = PARSE_WORKERS, backlog: int = PARSE_BACKLOG):
+        self.workers = workers
+        self.backlog = backlog
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=process_context())
+            return self._executor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Слот страницы: берётся до загрузки, освобождается после разбора."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.backlog)
+        if self._slots.locked():
+            metrics.inc("parse_backpressure_waits_total")
+        async with self._slots:
+            yield
+
+    async def parse(self, html: str, base_url: str):
+        """(url картинки, текст) — разбор в процессе пула, цикл событий не блокируется."""
+        loop = asyncio.get_running_loop()
+        with metrics.timer("parse_seconds"):
+            return await loop.run_in_executor(self.executor, parse_page, html, base_url)
+
+
+def _fetch_and_parse(executor, url):
+    html, base_url = fetch_page(url)
+    if not html:
+        return None, None
+    return executor.submit(parse_page, html, base_url).result()
+
+
+def fetch_and_parse(urls: dict, fetch_workers: int = 8, workers: int = PARSE_WORKERS,
+                    backlog: int = PARSE_BACKLOG):
+    """
+    Синхронный вариант для extract_all_articles: {ключ: url} → итератор (ключ, (картинка, текст)).
+    Загрузка — в потоках, разбор — в процессах; не больше backlog страниц одновременно.
+    Ошибка страницы возвращается вместо результата.
+    """
+    if not urls:
+        return
+    slots = threading.BoundedSemaphore(backlog)
+    cpu = ProcessPoolExecutor(max_workers=min(workers, len(urls)), mp_context=process_context())
+    with cpu, ThreadPoolExecutor(max_workers=fetch_workers) as io:
+        futures = {}
+        for key, url in urls.items():
+            slots.acquire()
+            future = io.submit(_fetch_and_parse, cpu, url)
+            future.add_done_callback(lambda _: slots.release())
+            futures[future] = key
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
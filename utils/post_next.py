@@ -1,109 +1,118 @@
 # utils/post_next.py
-import json
-import time
+# Запускается кроном каждые 15 минут, поэтому импорты здесь лёгкие:
+# Telegram-клиент, pytz и .env подгружаются только когда действительно есть что отправить.
 import argparse
+import time
 from datetime import datetime
-from pathlib import Path
-import pytz
+from core import metrics, storage
 from core.logger import log
-from utils.post_to_telegram import send_post
-
-# === Пути ===
-DATA_DIR = Path("data")
-SCHEDULE_FILE = DATA_DIR / "schedule.json"
-SELECTED_FILE = DATA_DIR / "selected.json"
-SENT_FILE = DATA_DIR / "sent_news.json"
 
 # === Часовой пояс ===
-tz = pytz.timezone("Europe/Belgrade")
+TIMEZONE = "Europe/Belgrade"
+_tz = None
+
+
+def local_tz():
+    global _tz
+    if _tz is None:
+        import pytz
+
+        _tz = pytz.timezone(TIMEZONE)
+    return _tz
+
 
+def publish(item, sent):
+    """Отправляет пост и записывает результат в журнал отправок."""
+    from utils.post_to_telegram import send_post
 
-def load_json(path, default):
-    if path.exists():
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            log.warning(f"⚠️ Ошибка чтения {path.name}: {e}")
-    return default
+    started = time.perf_counter()
+    try:
+        result = send_post(item)
+        error = result.error
+    except Exception as e:
+        result, error = None, str(e)
+    metrics.observe("send_seconds", time.perf_counter() - started)
+    metrics.inc("posts_sent_total", result="ok" if result is not None and result.ok else "failed")
 
+    if result is None or not result.ok:
+        log.error(f"❌ Ошибка при публикации {item.get('title')}: {error}")
+        storage.record_send(item["id"], ok=False, detail=error)
+        return False
 
-def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    storage.record_send(item["id"], ok=True)
+    sent.add(item["id"])
+    log.info(f"✅ Опубликовано: {item['title']}")
+    return True
 
 
+@metrics.stage("post")
 def post_next(instant=False):
     """Фоновая публикация новостей по расписанию или мгновенно при instant=True."""
     log.info("🚀 Запуск постинга по расписанию")
 
-    schedule = load_json(SCHEDULE_FILE, [])
-    selected = load_json(SELECTED_FILE, [])
-    sent = set(load_json(SENT_FILE, []))
-
-    if not schedule or not selected:
+    schedule = storage.load_schedule()
+    if not schedule:
         log.warning("⚠️ Нет расписания или списка статей — постинг невозможен.")
         return
 
-    # === Сопоставление расписания и статей ===
-    schedule_map = {}
-    for i, s in enumerate(schedule):
-        try:
-            t = s["time"] if isinstance(s, dict) else s
-            news_id = s.get("id") if isinstance(s, dict) else selected[i].get("id")
-            schedule_map[news_id] = datetime.strptime(t, "%Y-%m-%d %H:%M")
-        except Exception:
-            continue
-
-    log.info(f"📋 Загружено расписание на {len(schedule_map)} постов.")
+    log.info(f"📋 Загружено расписание на {len(schedule)} постов.")
+    # восстановление после перезапуска: отправленное — из журнала, проверка дальше O(1)
+    sent = storage.sent_ids()
 
     if instant:
         log.info("⚡ Режим instant: публикуем все посты сразу.")
-        for item in selected:
-            news_id = item.get("id")
-            if news_id in sent:
-                continue
-            try:
-                send_post(item)
-                sent.add(news_id)
-                save_json(SENT_FILE, list(sent))
-                log.info(f"✅ Опубликовано: {item['title']}")
-                time.sleep(2)  # небольшая пауза между постами
-            except Exception as e:
-                log.error(f"❌ Ошибка при публикации {item.get('title')}: {e}")
+        # темп задают лимиты Telegram в клиенте доставки, без фиксированных пауз
+        for item in storage.load_selected():
+            if item["id"] not in sent:
+                publish(item, sent)
+        storage.compact_send_log()
         return
 
-    # === Обычный режим (фон, проверка по времени) ===
-    while True:
-        now = datetime.now(tz)
-        for item in selected:
-            news_id = item.get("id")
-            post_time = schedule_map.get(news_id)
-            if not post_time:
-                continue
-
-            if post_time.tzinfo is None:
-                post_time = tz.localize(post_time)
-
-            if news_id in sent:
-                continue
-
-            # Если текущее время >= времени поста
-            if now >= post_time:
-                try:
-                    send_post(item)
-                    sent.add(news_id)
-                    save_json(SENT_FILE, list(sent))
-                    log.info(f"✅ Опубликовано: {item['title']}")
-                except Exception as e:
-                    log.error(f"❌ Ошибка при публикации {item.get('title')}: {e}")
+    # === Обычный режим: очередь по времени, сон ровно до ближайшего поста ===
+    from utils.post_queue import PostQueue
+
+    tz = local_tz()
+    queue = PostQueue()
+    for item in schedule:
+        if item["id"] not in sent:
+            post_time = tz.localize(datetime.strptime(item["time"], "%Y-%m-%d %H:%M"))
+            queue.add(item, post_time.timestamp())
+
+    log.info(f"🕒 В очереди {len(queue)} постов.")
+    queue.run(lambda item: publish(item, sent))
+    queue.log_lateness()
+    storage.compact_send_log()
+
+
+def post_due():
+    """
+    Один проход для крона: отправляет сегодняшние посты, время которых наступило, и выходит.
+    Если отправлять нечего, Telegram-клиент даже не импортируется.
+    """
+    now = datetime.now(local_tz())
+    due = storage.due_items(now.strftime("%Y-%m-%d %H:%M"))
+    if not due:
+        log.info("💤 Нет постов, время которых наступило.")
+        return
 
-        time.sleep(60)
+    sent = set()
+    with metrics.timer("stage_seconds", stage="post"):
+        for item in due:
+            due_at = local_tz().localize(datetime.strptime(item["time"], "%Y-%m-%d %H:%M"))
+            metrics.observe("post_lateness_seconds", (now - due_at).total_seconds())
+            publish(item, sent)
+    storage.compact_send_log()
+    metrics.write("post")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Post IT news according to schedule")
     parser.add_argument("--instant", action="store_true", help="publish all posts immediately")
+    parser.add_argument("--once", action="store_true", help="publish posts that are due now and exit")
     args = parser.parse_args()
 
-    post_next(instant=args.instant)
+    if args.once:
+        post_due()
+    else:
+        post_next(instant=args.instant)
+        metrics.write("post")
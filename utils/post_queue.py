@@ -0,0 +1,132 @@
+# utils/post_queue.py
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from core import metrics
+from core.logger import log
+
+# === Повторные попытки ===
+POST_RETRY_DELAY = int(os.getenv("POST_RETRY_DELAY", "60"))  # секунды до первой повторной отправки
+POST_RETRY_MAX_DELAY = 15 * 60  # задержка удваивается до этого предела
+POST_RETRY_LIMIT = int(os.getenv("POST_RETRY_LIMIT", "20"))  # попыток на пост, потом он снимается
+
+
+class PostQueue:
+    """
+    Очередь публикаций по времени (min-heap).
+    run() спит ровно до ближайшего поста, а не опрашивает расписание раз в минуту;
+    add()/cancel() можно вызывать из других потоков во время работы.
+    Неудачная отправка возвращает пост в очередь с растущей задержкой.
+    """
+
+    def __init__(self):
+        self._heap = []  # (due_ts, seq, news_id)
+        self._items = {}  # news_id -> (due_ts, item); отсутствие = отменён/отправлен
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._attempts = {}  # news_id -> число неудачных отправок
+        self.lateness = []  # опоздание каждой отправки, секунды
+
+    def add(self, item: dict, due_ts: float):
+        """Добавляет (или переносит) пост на момент due_ts (unix time)."""
+        with self._cond:
+            current = self._items.get(item["id"])
+            self._items[item["id"]] = (due_ts, item)
+            if current is not None and current[0] == due_ts:
+                return  # время не изменилось — запись в куче уже есть
+            heapq.heappush(self._heap, (due_ts, next(self._seq), item["id"]))
+            self._cond.notify()
+
+    def cancel(self, news_id: str) -> bool:
+        with self._cond:
+            removed = self._items.pop(news_id, None) is not None
+            self._cond.notify()
+            return removed
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def _pop_due(self):
+        """Следующий актуальный пост: (due_ts, item) или None, если очередь пуста."""
+        while self._heap:
+            due_ts, _, news_id = self._heap[0]
+            entry = self._items.get(news_id)
+            if entry is None or entry[0] != due_ts:
+                # отменённая или перенесённая запись — выбрасываем лениво
+                heapq.heappop(self._heap)
+                continue
+            return entry
+        return None
+
+    def _retry(self, item: dict):
+        """Возвращает пост после неудачной отправки: 1, 2, 4... минуты, не дольше POST_RETRY_MAX_DELAY."""
+        attempts = self._attempts.get(item["id"], 0) + 1
+        self._attempts[item["id"]] = attempts
+        if attempts >= POST_RETRY_LIMIT:
+            log.error(f"❌ {item.get('title', item['id'])[:60]} — {attempts} неудачных попыток, пост снят")
+            metrics.dropped("send_failed")
+            return
+        delay = min(POST_RETRY_DELAY * 2 ** (attempts - 1), POST_RETRY_MAX_DELAY)
+        log.info(f"🔁 Повторная отправка через {delay} с (попытка {attempts + 1})")
+        self.add(item, time.time() + delay)
+
+    def run(self, send, until_empty: bool = True):
+        """
+        Отправляет посты по мере наступления их времени через send(item).
+        send возвращает True при успехе; при False или исключении пост повторяется позже.
+        until_empty=True — выход, когда очередь опустела; иначе ждёт новых add() до stop().
+        """
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    entry = self._pop_due()
+                    if entry is None:
+                        if until_empty:
+                            return
+                        self._cond.wait()
+                        continue
+                    delay = entry[0] - time.time()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(timeout=delay)
+
+                due_ts, item = entry
+                heapq.heappop(self._heap)
+                del self._items[item["id"]]
+
+            if item["id"] not in self._attempts:
+                # опоздание планировщика — в момент выборки, без времени отправки и повторов
+                late = time.time() - due_ts
+                self.lateness.append(late)
+                metrics.observe("post_lateness_seconds", late)
+                log.info(f"⏱ {item.get('title', item['id'])[:60]} — опоздание {late:.1f} с")
+
+            try:
+                ok = send(item)
+            except Exception as e:
+                log.exception(f"❌ Ошибка отправки {item['id']}: {e}")
+                ok = False
+            if ok:
+                self._attempts.pop(item["id"], None)
+            else:
+                self._retry(item)
+
+    def log_lateness(self):
+        if self.lateness:
+            avg = sum(self.lateness) / len(self.lateness)
+            log.info(
+                f"⏱ Отправлено {len(self.lateness)} постов: "
+                f"среднее опоздание {avg:.1f} с, максимум {max(self.lateness):.1f} с"
+            )
@@ -1,27 +1,100 @@
-from telegram import Bot
-from telegram.error import TelegramError
-import os
+import hashlib
 from html import unescape
+from pathlib import Path
 import re
-from dotenv import load_dotenv
+from core import storage
+from core.config import env
+from core.logger import log
+from utils.telegram_delivery import REJECTED, SendResult, TelegramDelivery
+
+CAPTION_LIMIT = 1024  # ограничение Telegram на подпись к фото
+_delivery = None
+
+
+def get_delivery():
+    """Общий клиент доставки (создаётся при первой отправке)."""
+    global _delivery
+    if _delivery is None:
+        _delivery = TelegramDelivery(env("TELEGRAM_TOKEN"))
+    return _delivery
+
+
+def reset_delivery():
+    """Сбрасывает клиент доставки — следующая отправка создаст его с текущим токеном."""
+    global _delivery
+    _delivery = None
 
-load_dotenv()
-BOT_TOKEN = os.getenv("TELEGRAM_TOKEN")
-CHAT_ID = os.getenv("TELEGRAM_CHAT")
-bot = Bot(token=BOT_TOKEN)
 
 def clean_html(text):
     text = re.sub(r'<[^>]+>', '', text)
     return unescape(text)
 
-def send_post(news_item):
+
+def format_post(news_item, limit=None):
     title = news_item.get("title", "Без названия")
-    summary = news_item.get("summary", "")
+    summary = clean_html(news_item.get("summary", ""))
     url = news_item.get("url", "")
-    text = f"<b>{title}</b>\n\n{clean_html(summary)}\n\n<a href='{url}'>Читать далее →</a>"
+    text = f"<b>{title}</b>\n\n{summary}\n\n<a href='{url}'>Читать далее →</a>"
+    if limit and len(text) > limit:
+        # укорачиваем только описание — заголовок и ссылка должны остаться целыми
+        cut = max(0, len(summary) - (len(text) - limit) - 1)
+        summary = summary[:cut].rstrip() + "…"
+        text = f"<b>{title}</b>\n\n{summary}\n\n<a href='{url}'>Читать далее →</a>"
+    return text
+
+
+def send_photo_post(chat_id, image_path: Path, caption: str) -> SendResult:
+    """
+    Отправляет фото с подписью. Байты картинки загружаются в Telegram один раз:
+    file_id из ответа кешируется по хешу содержимого и используется при повторах
+    и отправке в другие чаты.
+    """
+    data = image_path.read_bytes()
+    content_hash = hashlib.sha1(data).hexdigest()
+    delivery = get_delivery()
+
+    file_id = storage.get_file_id(content_hash)
+    if file_id:
+        result = delivery.call("send_photo", chat_id, photo=file_id, caption=caption, parse_mode="HTML")
+        if result.ok or result.kind != REJECTED:
+            # сетевая ошибка или таймаут: сообщение могло дойти — повтор решает вызывающий,
+            # иначе те же байты ушли бы ещё раз и пост мог бы выйти дважды
+            return result
+        # file_id мог устареть или принадлежать другому боту — загружаем заново
+        log.warning(f"⚠️ file_id не принят ({result.error}), загружаем картинку заново")
+        storage.forget_file_id(content_hash)
+
+    result = delivery.call(
+        "send_photo", chat_id, photo=data, filename=image_path.name, caption=caption, parse_mode="HTML"
+    )
+    if result.ok and result.result is not None and result.result.photo:
+        storage.save_file_id(content_hash, result.result.photo[-1].file_id)
+    return result
+
+
+def send_post(news_item, chat_id=None) -> SendResult:
+    """
+    Отправляет пост в канал: с превью-картинкой, если она скачана при сборе,
+    иначе текстом. Результат (успех/ошибка) возвращается вызывающему.
+    """
+    chat_id = chat_id or env("TELEGRAM_CHAT")
+    title = news_item.get("title", "Без названия")
+    image_path = Path(news_item["image_path"]) if news_item.get("image_path") else None
+
+    result = None
+    if image_path and image_path.exists():
+        result = send_photo_post(chat_id, image_path, format_post(news_item, limit=CAPTION_LIMIT))
+        if not result.ok and result.kind != REJECTED:
+            # фото могло дойти — текстовый дубль не отправляем
+            print(f"[Telegram error] {result.error}")
+            return result
+        if not result.ok:
+            log.warning(f"⚠️ Фото не отправлено ({result.error}), отправляем текстом")
+    if result is None or not result.ok:
+        result = get_delivery().send_message(chat_id, format_post(news_item), parse_mode="HTML")
 
-    try:
-        bot.send_message(chat_id=CHAT_ID, text=text, parse_mode="HTML")
+    if result.ok:
         print(f"[OK] Sent: {title}")
-    except TelegramError as e:
-        print(f"[Telegram error] {e}")
+    else:
+        print(f"[Telegram error] {result.error}")
+    return result
@@ -0,0 +1,155 @@
+# utils/ranker.py
+import json
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from core import storage
+from core.logger import log
+from utils.article_extractor import read_article_text
+
+# === Профиль ранжирования ===
+# Переопределяется файлом data/ranking.json (любые ключи верхнего уровня).
+RANKING_FILE = Path("data/ranking.json")
+DEFAULT_PROFILE = {
+    # термин (одно слово, в нижнем регистре) -> вес в тематическом запросе
+    "topics": {
+        "ai": 2.0, "llm": 2.0, "openai": 1.5, "anthropic": 1.5, "gemini": 1.0, "model": 1.0,
+        "security": 1.5, "vulnerability": 1.5, "malware": 1.5, "breach": 1.0,
+        "developer": 1.0, "github": 1.0, "python": 1.0, "kubernetes": 1.0, "cloud": 1.0,
+        "database": 1.0, "api": 0.5, "startup": 0.5, "chip": 1.0, "nvidia": 1.0,
+    },
+    # название источника (как в RSS) -> множитель итоговой оценки
+    "sources": {},
+    # веса компонентов итоговой оценки
+    "weights": {"topic": 0.5, "length": 0.3, "recency": 0.2},
+    "recency_half_life_hours": 12,
+    "bm25_k1": 1.5,
+    "bm25_b": 0.75,
+}
+
+
+def load_profile() -> dict:
+    """
+    Профиль по умолчанию с переопределениями из RANKING_FILE.
+    Вложенные словари (topics, sources, weights) дополняются по ключам, а не заменяются.
+    """
+    profile = {k: dict(v) if isinstance(v, dict) else v for k, v in DEFAULT_PROFILE.items()}
+    if RANKING_FILE.exists():
+        try:
+            for key, value in json.loads(RANKING_FILE.read_text(encoding="utf-8")).items():
+                if isinstance(value, dict) and isinstance(profile.get(key), dict):
+                    profile[key].update(value)
+                else:
+                    profile[key] = value
+        except Exception as e:
+            log.warning(f"⚠️ Не удалось загрузить {RANKING_FILE}: {e}")
+    return profile
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in re.findall(r"\w+", text.lower()) if len(t) > 1]
+
+
+def term_matrix(docs: list[list[str]]):
+    """Разреженная матрица частот термов (документы × словарь) и словарь."""
+    vocab = {}
+    indptr, indices, data = [0], [], []
+    for tokens in docs:
+        for term, count in Counter(tokens).items():
+            indices.append(vocab.setdefault(term, len(vocab)))
+            data.append(count)
+        indptr.append(len(indices))
+    tf = csr_matrix(
+        (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr)),
+        shape=(len(docs), len(vocab)),
+    )
+    return tf, vocab
+
+
+def bm25_weights(tf: csr_matrix, k1: float, b: float):
+    """BM25-веса термов в документах (та же разреженность, что у tf) и вектор idf."""
+    n_docs = tf.shape[0]
+    doc_len = np.asarray(tf.sum(axis=1)).ravel()
+    avg_len = doc_len.mean() if n_docs else 1.0
+    doc_freq = np.bincount(tf.indices, minlength=tf.shape[1])
+    idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    norm = k1 * (1 - b + b * doc_len / max(avg_len, 1.0))
+    rows = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+    weights = tf.copy()
+    weights.data = tf.data * (k1 + 1) / (tf.data + norm[rows])
+    return weights, idf
+
+
+def _scaled(values: np.ndarray) -> np.ndarray:
+    top = values.max() if values.size else 0.0
+    return values / top if top > 0 else np.zeros_like(values)
+
+
+def _published_ts(item: dict) -> float:
+    try:
+        dt = datetime.fromisoformat(item.get("published_at", "").replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    except ValueError:
+        return np.nan
+
+
+def score_articles(items: list[dict], texts: list[str], profile: dict) -> dict[str, np.ndarray]:
+    """
+    Оценивает все статьи одним векторным проходом.
+    Возвращает массивы компонентов (topic, length, recency, source) и итог total.
+    """
+    tf, vocab = term_matrix([tokenize(f"{n['title']}\n{t}") for n, t in zip(items, texts)])
+    weights, idf = bm25_weights(tf, profile["bm25_k1"], profile["bm25_b"])
+
+    # тематический запрос: вес термина профиля × idf
+    query = np.zeros(len(vocab))
+    for term, w in profile["topics"].items():
+        if term in vocab:
+            query[vocab[term]] = w
+    topic = _scaled(weights @ (query * idf))
+
+    char_count = np.array([n.get("char_count") or 0 for n in items], dtype=np.float64)
+    length = _scaled(np.log1p(char_count))
+
+    published = np.array([_published_ts(n) for n in items])
+    age_hours = np.clip((datetime.now(timezone.utc).timestamp() - published) / 3600, 0, None)
+    recency = np.nan_to_num(0.5 ** (age_hours / profile["recency_half_life_hours"]), nan=0.0)
+
+    source = np.array([profile["sources"].get(n.get("source"), 1.0) for n in items], dtype=np.float64)
+
+    w = profile["weights"]
+    total = (w["topic"] * topic + w["length"] * length + w["recency"] * recency) * source
+    return {"topic": topic, "length": length, "recency": recency, "source": source, "total": total}
+
+
+def rank_articles(top_n: int = 3) -> list[dict]:
+    """
+    Ранжирует сегодняшние статьи (без дубликатов) и берёт top_n лучших от каждого источника.
+    Результат упорядочен по итоговой оценке; компоненты лежат в поле "scores".
+    """
+    items = storage.load_extracted_items(exclude_duplicates=True)
+    if not items:
+        return []
+
+    texts = [read_article_text(n["id"]) or "" for n in items]
+    scores = score_articles(items, texts, load_profile())
+
+    selected = []
+    per_source = Counter()
+    for i in np.argsort(-scores["total"], kind="stable"):
+        item = items[i]
+        src = item.get("source")
+        if per_source[src] >= top_n:
+            continue
+        per_source[src] += 1
+        item["scores"] = {name: round(float(values[i]), 4) for name, values in scores.items()}
+        selected.append(item)
+    return selected
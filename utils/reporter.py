@@ -1,18 +1,10 @@
-import json
 from datetime import datetime
-from dotenv import load_dotenv
 from pathlib import Path
-from telegram import Bot
-import os
-
-# === Настройки окружения ===
-env_path = Path(__file__).resolve().parents[1] / ".env"
-load_dotenv(dotenv_path=env_path)
+from core import storage
+from core.config import env
+from utils.telegram_delivery import TelegramDelivery
 
 REPORT_FILE = Path("data/report.txt")
-SCHEDULE_FILE = Path("data/schedule.json")
-TECH_CHAT = os.getenv("TELEGRAM_CHAT")
-BOT_TOKEN = os.getenv("REPORT_TELEGRAM_TOKEN")
 
 
 def send_report(selected: list[dict]):
@@ -25,19 +17,13 @@ def send_report(selected: list[dict]):
     total = len(selected)
 
     # === Загружаем расписание, если есть ===
-    if SCHEDULE_FILE.exists():
-        try:
-            schedule = json.loads(SCHEDULE_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            schedule = []
-    else:
-        schedule = []
+    schedule = {s["id"]: s["time"].split(" ")[-1] for s in storage.load_schedule()}
 
     # === Группировка по источникам ===
     sources = {}
-    for i, n in enumerate(selected):
+    for n in selected:
         src = n.get("source", "Неизвестный источник")
-        n["_schedule_time"] = schedule[i] if i < len(schedule) else None
+        n["_schedule_time"] = schedule.get(n.get("id"))
         sources.setdefault(src, []).append(n)
 
     # === Формирование HTML-отчёта ===
@@ -67,13 +53,13 @@ def send_report(selected: list[dict]):
     REPORT_FILE.write_text(plain_text, encoding="utf-8")
 
     # === Отправка в Telegram ===
-    if not BOT_TOKEN or not TECH_CHAT:
+    bot_token, tech_chat = env("REPORT_TELEGRAM_TOKEN"), env("TELEGRAM_CHAT")
+    if not bot_token or not tech_chat:
         print("⚠️ Не задан TELEGRAM_CHAT или REPORT_TELEGRAM_TOKEN — отчёт не отправлен.")
         return
 
-    bot = Bot(token=BOT_TOKEN)
-    try:
-        bot.send_message(chat_id=TECH_CHAT, text=text, parse_mode="HTML")
+    result = TelegramDelivery(bot_token).send_message(tech_chat, text, parse_mode="HTML")
+    if result.ok:
         print(f"✅ Отчёт отправлен в техчат ({total} статей).")
-    except Exception as e:
-        print(f"⚠️ Ошибка при отправке отчёта: {e}")
+    else:
+        print(f"⚠️ Ошибка при отправке отчёта: {result.error}")
@@ -1,86 +1,105 @@
 # utils/scheduler.py
 import json
 import random
-import os
 from datetime import datetime, timedelta
 from pathlib import Path
 import pytz
-from telegram import Bot
+from core import metrics, storage
+from core.config import env
 from core.logger import log
+from utils.telegram_delivery import TelegramDelivery
 
 
 # === Пути и конфигурация ===
 DATA_DIR = Path("data")
-DATA_DIR.mkdir(exist_ok=True)
-SELECTED_FILE = DATA_DIR / "selected.json"
 SCHEDULE_FILE = DATA_DIR / "schedule.json"
 
-# === Telegram ===
-BOT_TOKEN = os.getenv("REPORT_TELEGRAM_TOKEN")
-TECH_CHAT_ID = os.getenv("TELEGRAM_CHAT")
-
 # === Локальный часовой пояс ===
 tz = pytz.timezone("Europe/Belgrade")
 
 
+@metrics.stage("schedule")
 def build_schedule(
     start_hour: int = 9,
     end_hour: int = 21,
     per_source_limit: int = 5,
     daily_limit: int = 20,
+    incremental: bool = False,
 ):
     """
     Формирует равномерное расписание публикаций на день.
     - ограничивает максимум per_source_limit статей с одного источника
-    - максимум daily_limit публикаций в день
+    - максимум daily_limit публикаций в день (лучшие по оценке отбора)
     - перемешивает порядок
-    - сохраняет расписание в data/schedule.json
+    - сохраняет расписание в базу и экспорт в data/schedule.json
     - отправляет отчёт в техчат
+    incremental=True (режим демона): уже запланированные статьи остаются в плане
+    и учитываются в лимитах, новые добавляются к ещё не наступившим постам,
+    и вместе они заново распределяются до end_hour. Возвращаются только
+    перепланированные посты; если новых статей нет, план не меняется.
     """
 
     # === Загружаем отобранные новости ===
-    if not SELECTED_FILE.exists():
-        log.warning("⚠️ Файл selected.json не найден, нечего планировать.")
-        return []
-
-    with open(SELECTED_FILE, "r", encoding="utf-8") as f:
-        selected = json.load(f)
+    selected = storage.load_selected()
 
     if not selected:
         log.warning("⚠️ Нет новостей для расписания.")
         return []
 
+    now = datetime.now(tz)
+    planned = storage.load_schedule() if incremental else []
+    planned_ids = {p["id"] for p in planned}
+
     # === Ограничиваем по источникам ===
     filtered = []
     source_counter = {}
+    for item in planned:
+        src = item.get("source", "unknown")
+        source_counter[src] = source_counter.get(src, 0) + 1
     for item in selected:
+        if item["id"] in planned_ids:
+            continue
         src = item.get("source", "unknown")
         if source_counter.get(src, 0) < per_source_limit:
             filtered.append(item)
             source_counter[src] = source_counter.get(src, 0) + 1
-
-    # === Перемешиваем, чтобы чередовались источники ===
-    random.shuffle(filtered)
-
-    # === Применяем дневной лимит ===
-    if len(filtered) > daily_limit:
-        filtered = filtered[:daily_limit]
+        else:
+            metrics.dropped("per_source_limit")
+
+    # === Применяем дневной лимит (selected упорядочен по оценке — остаются лучшие) ===
+    room = daily_limit - len(planned)
+    if len(filtered) > room:
+        metrics.dropped("daily_limit", len(filtered) - max(room, 0))
+        filtered = filtered[:max(room, 0)]
         log.info(f"📊 Ограничено дневным лимитом: {daily_limit} статей.")
     else:
         log.info(f"📊 Всего статей для публикации: {len(filtered)}")
 
+    if incremental:
+        if not filtered:
+            return []
+        # ещё не наступившие и не отправленные посты переносятся вместе с новыми
+        sent = storage.sent_ids()
+        now_str = now.strftime("%Y-%m-%d %H:%M")
+        filtered += [p for p in planned if p["id"] not in sent and p["time"] > now_str]
+
+    # === Перемешиваем, чтобы чередовались источники ===
+    random.shuffle(filtered)
+
     news_count = len(filtered)
     if news_count == 0:
         log.warning("⚠️ После фильтрации не осталось статей.")
         return []
 
     # === Расчёт времени ===
-    now = datetime.now(tz)
     start_time = now.replace(hour=start_hour, minute=0, second=0, microsecond=0)
     end_time = now.replace(hour=end_hour, minute=0, second=0, microsecond=0)
 
     if now > start_time:
         start_time = now + timedelta(minutes=5)
+    if incremental and start_time >= end_time:
+        log.info("🌙 До конца окна публикаций не осталось времени — новые статьи не запланированы.")
+        return []
 
     total_minutes = (end_time - start_time).total_seconds() / 60
     interval = total_minutes / news_count
@@ -98,13 +117,16 @@ def build_schedule(
         })
 
     # === Сохраняем план ===
+    storage.save_schedule(schedule, replace_day=None if incremental else now.strftime("%Y-%m-%d"))
+    DATA_DIR.mkdir(exist_ok=True)
+    export = storage.load_schedule() if incremental else schedule
     with open(SCHEDULE_FILE, "w", encoding="utf-8") as f:
-        json.dump(schedule, f, ensure_ascii=False, indent=2)
+        json.dump(export, f, ensure_ascii=False, indent=2)
 
     first_time = schedule[0]["time"].split(" ")[1]
     last_time = schedule[-1]["time"].split(" ")[1]
     log.info(
-        f"🕒 Расписание создано: {news_count} публикаций "
+        f"🕒 Расписание {'обновлено' if incremental else 'создано'}: {news_count} публикаций "
         f"с {first_time} до {last_time} (интервал ~{interval:.1f} мин)"
     )
 
@@ -116,18 +138,18 @@ def build_schedule(
 
 def send_schedule_report(plan):
     """Отправляет в техчат краткий отчёт о плане публикаций."""
-    if not BOT_TOKEN or not TECH_CHAT_ID:
+    bot_token, tech_chat = env("REPORT_TELEGRAM_TOKEN"), env("TELEGRAM_CHAT")
+    if not bot_token or not tech_chat:
         log.warning("⚠️ Не заданы TELEGRAM_CHAT или REPORT_TELEGRAM_TOKEN.")
         return
 
-    bot = Bot(token=BOT_TOKEN)
     text = "<b>🗓 План публикаций на день</b>\n\n"
 
     for item in plan:
         text += f"🕒 {item['time']}\n<b>{item['title']}</b>\n<i>{item['source']}</i>\n\n"
 
-    try:
-        bot.send_message(chat_id=TECH_CHAT_ID, text=text.strip(), parse_mode="HTML")
+    result = TelegramDelivery(bot_token).send_message(tech_chat, text.strip(), parse_mode="HTML")
+    if result.ok:
         log.info("📨 План публикаций успешно отправлен в техчат.")
-    except Exception as e:
-        log.error(f"⚠️ Ошибка при отправке отчёта в Telegram: {e}")
+    else:
+        log.error(f"⚠️ Ошибка при отправке отчёта в Telegram: {result.error}")
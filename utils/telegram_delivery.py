@@ -0,0 +1,151 @@
+# utils/telegram_delivery.py
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from core.logger import log
+
+# === Лимиты Telegram Bot API ===
+GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "30"))  # сообщений в секунду на бота
+CHAT_RATE = float(os.getenv("TG_CHAT_RATE", "1"))  # сообщений в секунду в один чат
+CHAT_PER_MINUTE = int(os.getenv("TG_CHAT_PER_MINUTE", "20"))  # сообщений в минуту в группу/канал
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0  # секунды; растёт вдвое с каждой попыткой
+POOL_SIZE = 8  # соединений в пуле HTTP-клиента бота
+
+# === Виды ошибок отправки (SendResult.kind) ===
+REJECTED = "rejected"  # BadRequest: запрос неверен, повтор того же не поможет
+TRANSIENT = "transient"  # сеть/таймаут/RetryAfter после всех повторов: сообщение могло дойти
+FATAL = "fatal"  # Unauthorized, ChatMigrated и т.п.
+
+
+class TokenBucket:
+    """Потокобезопасное ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Забирает токен (возможно, в долг) и возвращает, сколько нужно подождать."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate, self.blocked_until - now)
+
+    def pause(self, seconds: float):
+        """Запрещает выдачу токенов на seconds секунд (после RetryAfter)."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+@dataclass
+class SendResult:
+    ok: bool
+    message_id: int | None = None
+    error: str | None = None
+    attempts: int = 0
+    result: object = None  # объект telegram.Message при успехе
+    kind: str | None = None  # вид ошибки: REJECTED, TRANSIENT или FATAL
+
+
+def _not_sent(error) -> bool:
+    """
+    Ошибка соединения, случившаяся до отправки запроса (не удалось подключиться):
+    такой вызов можно повторить без риска опубликовать пост дважды.
+    """
+    from telegram.utils.request import urllib3
+
+    exceptions = urllib3.exceptions
+    cause = error.__cause__
+    if isinstance(cause, exceptions.MaxRetryError):
+        cause = cause.reason
+    return isinstance(cause, (exceptions.NewConnectionError, exceptions.ConnectTimeoutError))
+
+
+class TelegramDelivery:
+    """
+    Отправка в Telegram через один бот с пулом HTTP-соединений.
+    Соблюдает глобальный и per-chat лимиты, выполняет RetryAfter,
+    повторяет с экспоненциальной задержкой ошибки подключения
+    и возвращает результат каждой отправки вызывающему коду.
+    Таймаут или обрыв после отправки запроса не повторяется: Telegram мог уже
+    опубликовать сообщение, поэтому возвращается TRANSIENT и решает вызывающий.
+    """
+
+    def __init__(self, token: str, pool_size: int = POOL_SIZE, max_retries: int = MAX_RETRIES):
+        self.token = token
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self._bot = None
+        self._lock = threading.Lock()
+        self._global = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self._chats = {}
+
+    @property
+    def bot(self):
+        with self._lock:
+            if self._bot is None:
+                from telegram import Bot
+                from telegram.utils.request import Request
+
+                self._bot = Bot(token=self.token, request=Request(con_pool_size=self.pool_size))
+            return self._bot
+
+    def _chat_buckets(self, chat_id):
+        with self._lock:
+            if chat_id not in self._chats:
+                self._chats[chat_id] = (
+                    TokenBucket(CHAT_RATE, 1),
+                    TokenBucket(CHAT_PER_MINUTE / 60, CHAT_PER_MINUTE),
+                )
+            return self._chats[chat_id]
+
+    def _wait_turn(self, chat_id):
+        delay = max(bucket.reserve() for bucket in (self._global, *self._chat_buckets(chat_id)))
+        if delay > 0:
+            time.sleep(delay)
+
+    def call(self, method: str, chat_id, **kwargs) -> SendResult:
+        """Вызывает метод бота (send_message, send_photo, ...) с лимитами и повторами."""
+        from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+
+        attempt = 0
+        while True:
+            attempt += 1
+            self._wait_turn(chat_id)
+            try:
+                message = getattr(self.bot, method)(chat_id=chat_id, **kwargs)
+                return SendResult(True, getattr(message, "message_id", None), attempts=attempt, result=message)
+            except RetryAfter as e:
+                # сервер сам сказал, сколько ждать — тормозим все отправки в этот чат
+                for bucket in self._chat_buckets(chat_id):
+                    bucket.pause(e.retry_after)
+                log.warning(f"⏳ Telegram RetryAfter {e.retry_after} с (чат {chat_id})")
+                error = str(e)
+            except BadRequest as e:
+                # в python-telegram-bot 13 BadRequest наследует NetworkError, но повтор не поможет
+                return SendResult(False, error=str(e), attempts=attempt, kind=REJECTED)
+            except NetworkError as e:  # включая TimedOut
+                if attempt > self.max_retries or not _not_sent(e):
+                    return SendResult(False, error=str(e), attempts=attempt, kind=TRANSIENT)
+                delay = BACKOFF_BASE * 2 ** (attempt - 1)
+                log.warning(f"⚠️ Не удалось подключиться к Telegram ({e}), повтор через {delay:.0f} с")
+                time.sleep(delay)
+                error = str(e)
+            except TelegramError as e:
+                # Unauthorized, ChatMigrated и т.п. — повтор не поможет
+                return SendResult(False, error=str(e), attempts=attempt, kind=FATAL)
+
+            if attempt > self.max_retries:
+                return SendResult(False, error=error, attempts=attempt, kind=TRANSIENT)
+
+    def send_message(self, chat_id, text: str, **kwargs) -> SendResult:
+        return self.call("send_message", chat_id, text=text, **kwargs)